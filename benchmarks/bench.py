@@ -0,0 +1,351 @@
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from itertools import cycle
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for module_dir in ('validator', 'db_rep', 'environment_variables'):
+    path = os.path.join(ROOT, module_dir)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import env  # noqa: E402
+import payloads  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from db_handler import DBConfigSQLite, RDBMHandle, dispose_engines  # noqa: E402
+from validator import compile_schema, sanitize, sanitize_many, validate, validate_many  # noqa: E402
+
+
+class Workload(NamedTuple):
+    """run() is one timed operation over items records, teardown() runs once after the measurement"""
+
+    run: Callable[[], Any]
+    items: int
+    teardown: Optional[Callable[[], Any]] = None
+
+
+class Case(NamedTuple):
+    name: str
+    build: Callable[[int], Workload]
+    scaled: bool
+
+
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str, scaled: bool = True):
+    """Register a workload builder, it gets the number of records and returns a Workload
+
+    Cases that are not scaled work on single records and run only once, at the smallest scale.
+    """
+
+    def register(build: Callable[[int], Workload]) -> Callable[[int], Workload]:
+        CASES[name] = Case(name, build, scaled)
+        return build
+
+    return register
+
+
+# validator
+
+@case('validator.validate', scaled=False)
+def _validate(records: int) -> Workload:
+    customers = cycle(payloads.customers(min(records, 10000)))
+    return Workload(lambda: validate(next(customers), payloads.CUSTOMER_RULES), 1)
+
+
+@case('validator.sanitize', scaled=False)
+def _sanitize(records: int) -> Workload:
+    customers = cycle(payloads.customers(min(records, 10000)))
+    return Workload(lambda: sanitize(next(customers), payloads.CUSTOMER_RULES), 1)
+
+
+@case('validator.compiled.validate', scaled=False)
+def _compiled_validate(records: int) -> Workload:
+    schema = compile_schema(payloads.CUSTOMER_RULES)
+    customers = cycle(payloads.customers(min(records, 10000)))
+    return Workload(lambda: schema.validate(next(customers)), 1)
+
+
+@case('validator.nested.validate', scaled=False)
+def _nested_validate(records: int) -> Workload:
+    schema = compile_schema(payloads.ORDER_RULES)
+    orders = cycle(payloads.orders(min(records, 10000)))
+    return Workload(lambda: schema.validate(next(orders)), 1)
+
+
+@case('validator.validate_many')
+def _validate_many(records: int) -> Workload:
+    customers = payloads.customers(records)
+    return Workload(lambda: validate_many(customers, payloads.CUSTOMER_RULES), records)
+
+
+@case('validator.sanitize_many')
+def _sanitize_many(records: int) -> Workload:
+    customers = payloads.customers(records)
+    return Workload(lambda: sanitize_many(customers, payloads.CUSTOMER_RULES), records)
+
+
+@case('validator.nested.validate_many')
+def _nested_validate_many(records: int) -> Workload:
+    orders = payloads.orders(records)
+    return Workload(lambda: validate_many(orders, payloads.ORDER_RULES), records)
+
+
+# environment_variables
+
+@case('env.get_config', scaled=False)
+def _get_config(records: int) -> Workload:
+    return Workload(lambda: env.get_config(env.Vars.TEST1), 1)
+
+
+@case('env.get_config.environ', scaled=False)
+def _get_config_environ(records: int) -> Workload:
+    os.environ[env.Vars.TEST2.value] = 'from environment'
+    return Workload(lambda: env.get_config(env.Vars.TEST2), 1, lambda: os.environ.pop(env.Vars.TEST2.value))
+
+
+@case('env.load_snapshot', scaled=False)
+def _load_snapshot(records: int) -> Workload:
+    env.load_snapshot(reload=True)
+    return Workload(lambda: env.load_snapshot().TEST1, 1)
+
+
+# db_rep, every workload against an in memory and a file backed sqlite database
+
+def _sqlite_config(backend: str, name: str) -> DBConfigSQLite:
+    if backend == 'memory':
+        return DBConfigSQLite()
+    filename = os.path.join(os.environ.get('BENCH_TMP', '/tmp'), f'bench_{name}.db')
+    if os.path.exists(filename):
+        os.remove(filename)
+    return DBConfigSQLite(filename)
+
+
+def _prepared_handle(config: DBConfigSQLite, records: int) -> RDBMHandle:
+    handle = RDBMHandle(config).__enter__()
+    handle.conn.execute(text('drop table if exists bench'))
+    handle.conn.execute(text('create table bench (id integer primary key, name text, amount real, flag integer)'))
+    if records:
+        handle.conn.execute(text('insert into bench values (:id, :name, :amount, :flag)'), payloads.rows(records))
+    handle.conn.commit()
+    return handle
+
+
+def _cleanup(config: DBConfigSQLite):
+    dispose_engines(config)
+    if config.filename != ':memory:' and os.path.exists(config.filename):
+        os.remove(config.filename)
+
+
+def _closer(handle: RDBMHandle, config: DBConfigSQLite) -> Callable[[], None]:
+    def close():
+        handle.__exit__(None, None, None)
+        _cleanup(config)
+    return close
+
+
+def _register_db_cases(backend: str):
+    @case(f'db.sqlite_{backend}.open_close', scaled=False)
+    def _open_close(records: int) -> Workload:
+        config = _sqlite_config(backend, 'open_close')
+
+        def run():
+            with RDBMHandle(config) as handle:
+                handle.conn.execute(text('select 1')).fetchall()
+
+        return Workload(run, 1, lambda: _cleanup(config))
+
+    @case(f'db.sqlite_{backend}.insert')
+    def _insert(records: int) -> Workload:
+        config = _sqlite_config(backend, 'insert')
+        handle = _prepared_handle(config, 0)
+        rows = payloads.rows(records)
+
+        def run():
+            handle.conn.execute(text('delete from bench'))
+            handle.conn.execute(text('insert into bench values (:id, :name, :amount, :flag)'), rows)
+            handle.conn.commit()
+
+        return Workload(run, records, _closer(handle, config))
+
+    @case(f'db.sqlite_{backend}.lookup', scaled=False)
+    def _lookup(records: int) -> Workload:
+        config = _sqlite_config(backend, 'lookup')
+        handle = _prepared_handle(config, records)
+        ids = cycle(range(records))
+        return Workload(
+            lambda: handle.query('select * from bench where id = :id', {'id': next(ids)}), 1, _closer(handle, config)
+        )
+
+    @case(f'db.sqlite_{backend}.query')
+    def _query(records: int) -> Workload:
+        config = _sqlite_config(backend, 'query')
+        handle = _prepared_handle(config, records)
+        return Workload(lambda: handle.query('select * from bench', mappings=True), records, _closer(handle, config))
+
+    @case(f'db.sqlite_{backend}.fetch_columns')
+    def _fetch_columns(records: int) -> Workload:
+        config = _sqlite_config(backend, 'fetch_columns')
+        handle = _prepared_handle(config, records)
+        return Workload(lambda: handle.fetch_columns('select * from bench'), records, _closer(handle, config))
+
+
+_register_db_cases('memory')
+_register_db_cases('file')
+
+
+def measure(workload: Workload, min_time: float = 1.0, min_iterations: int = 3,
+            max_iterations: int = 100000) -> Dict[str, Any]:
+    """Time workload.run() until min_time passed (at least min_iterations times), then one run under tracemalloc
+
+    Latencies are per run, throughput is records per second over all runs.
+    """
+    workload.run()  # warm up caches, pools and lazily built plans
+    latencies = []
+    clock = time.perf_counter
+    started = clock()
+    while len(latencies) < max_iterations and (len(latencies) < min_iterations or clock() - started < min_time):
+        start = clock()
+        workload.run()
+        latencies.append(clock() - start)
+    total = sum(latencies)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        workload.run()
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'items': workload.items,
+        'iterations': len(latencies),
+        'seconds': total,
+        'throughput': workload.items * len(latencies) / total if total else 0.0,
+        'p50': _percentile(latencies, 0.5),
+        'p99': _percentile(latencies, 0.99),
+        'peak_memory': peak,
+    }
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def run(patterns: Iterable[str] = ('*',), scales: Iterable[int] = (1000, 10000), min_time: float = 1.0,
+        min_iterations: int = 3, report: Optional[Callable[[str, Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+    """Run the cases matching any of the fnmatch patterns, the keys of the results are name[records]"""
+    scales = sorted(scales)
+    results = {}
+    for name, registered in CASES.items():
+        if not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        for records in scales if registered.scaled else scales[:1]:
+            workload = registered.build(records)
+            try:
+                result = dict(name=name, records=records, **measure(workload, min_time, min_iterations))
+            finally:
+                if workload.teardown is not None:
+                    workload.teardown()
+            results[f'{name}[{records}]'] = result
+            if report is not None:
+                report(f'{name}[{records}]', result)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2,
+            memory_threshold: Optional[float] = None) -> List[str]:
+    """Regressions of current against baseline: throughput lower or peak memory higher than the threshold allows
+
+    Memory differences below 64 KiB are ignored as noise. Cases missing in either run are skipped.
+    """
+    memory_threshold = threshold if memory_threshold is None else memory_threshold
+    regressions = []
+    for key, result in current['results'].items():
+        before = baseline.get('results', {}).get(key)
+        if before is None:
+            continue
+        if before['throughput'] and result['throughput'] < before['throughput'] * (1 - threshold):
+            regressions.append(f"{key}: throughput {result['throughput']:.0f}/s < baseline "
+                               f"{before['throughput']:.0f}/s (-{1 - result['throughput'] / before['throughput']:.0%})")
+        allowed = max(before['peak_memory'] * (1 + memory_threshold), before['peak_memory'] + 64 * 1024)
+        if result['peak_memory'] > allowed:
+            regressions.append(f"{key}: peak memory {result['peak_memory'] / 1024:.0f} KiB > baseline "
+                               f"{before['peak_memory'] / 1024:.0f} KiB")
+    return regressions
+
+
+def _print_result(key: str, result: Dict[str, Any]):
+    print(f"{key:45} {result['throughput']:>12,.0f} rec/s   p50 {_duration(result['p50']):>9}   "
+          f"p99 {_duration(result['p99']):>9}   peak {result['peak_memory'] / 1024:>9,.0f} KiB", flush=True)
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.1f}us'
+    if seconds < 1:
+        return f'{seconds * 1e3:.2f}ms'
+    return f'{seconds:.2f}s'
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks of validator, db_rep and environment_variables.')
+    parser.add_argument('patterns', nargs='*', default=['*'], help='fnmatch patterns of the cases, e.g. "validator.*"')
+    parser.add_argument('--records', default='1000,10000',
+                        help='comma separated batch sizes of the scaled cases, e.g. 1000,100000,1000000')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds every case is repeated at least')
+    parser.add_argument('--min-iterations', type=int, default=3)
+    parser.add_argument('--save', help='write the results as JSON baseline to this file')
+    parser.add_argument('--compare', help='JSON baseline to compare against, exits with 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative throughput drop')
+    parser.add_argument('--memory-threshold', type=float, help='allowed relative peak memory growth, default threshold')
+    parser.add_argument('--log-level', default='ERROR',
+                        help='level of the module loggers, the sanitize warnings would flood the output')
+    parser.add_argument('--list', action='store_true', help='list the cases and exit')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level)
+
+    if args.list:
+        for name, registered in CASES.items():
+            print(f"{name}{'' if registered.scaled else '  (single records)'}")
+        return 0
+
+    scales = [int(value) for value in args.records.split(',') if value]
+    results = run(args.patterns, scales, args.min_time, args.min_iterations, report=_print_result)
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f'baseline written to {args.save}')
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+        print(f'no regressions against {args.compare} (threshold {args.threshold:.0%})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,14 @@
+import logging
+
+from bench import compare, run
+
+logging.basicConfig(level=logging.ERROR)  # no warning per sanitized record
+
+# run the validator cases for two batch sizes, half a second each
+baseline = run(['validator.*'], scales=[1000, 5000], min_time=0.5)
+for key, result in baseline['results'].items():
+    print(key, f"{result['throughput']:.0f} records/s", f"p99 {result['p99'] * 1000:.2f}ms")
+
+# a second run compared against the first one, every throughput drop of more than 30% is reported
+current = run(['validator.*'], scales=[1000, 5000], min_time=0.5)
+print(compare(current, baseline, threshold=0.3) or 'no regressions')
@@ -0,0 +1,107 @@
+import random
+import string
+from datetime import date, timedelta
+from enum import Enum
+from typing import Any, Dict, List
+
+from validator import is_optional_date_in_past, is_optional_email, is_optional_not_empty_string, \
+    is_optional_enum, is_defined_string, is_positive_number, is_optional_bool, is_valid_uri
+
+
+class Gender(str, Enum):
+    FEMALE = 'female'
+    MALE = 'male'
+    DIVERSE = 'diverse'
+
+
+# the CUSTOMER_SANITIZER of validator/example.py, which can not be imported without running the example
+CUSTOMER_RULES = {
+    'username': [is_optional_not_empty_string()],
+    'email': [is_optional_email()],
+    'firstname': [is_optional_not_empty_string()],
+    'lastname': [is_optional_not_empty_string()],
+    'birthday': [is_optional_date_in_past('%Y-%m-%d')],
+    'telephone_number': [is_optional_not_empty_string()],
+    'another_id': [is_optional_not_empty_string()],
+    'another_id2': [is_optional_not_empty_string()],
+    'hashed_password': [is_optional_not_empty_string()]
+}
+
+ORDER_RULES = {
+    'order_id': [is_defined_string()],
+    'customer': CUSTOMER_RULES,
+    'shipping': {
+        'street': [is_optional_not_empty_string()],
+        'zip': [is_defined_string()],
+        'country': {
+            'code': [is_defined_string()],
+            'name': [is_optional_not_empty_string()],
+        },
+    },
+    'payment': {
+        'amount': [is_positive_number()],
+        'paid': [is_optional_bool()],
+        'callback': [is_valid_uri()],
+    },
+    'gender': [is_optional_enum(Gender)],
+}
+
+FIRSTNAMES = ['Nick', 'Anna', 'Lukas', 'Mia', 'Jonas', 'Lea', 'Paul', 'Emma']
+LASTNAMES = ['Meier', 'Schmidt', 'Schulz', 'Fischer', 'Weber', 'Wagner']
+DOMAINS = ['test.de', 'example.com', 'mail.org']
+
+
+def customers(count: int, invalid_ratio: float = 0.1, seed: int = 42) -> List[Dict[str, Any]]:
+    """Scaled up ExampleCustomer records, invalid_ratio of them break one rule (e-mail, date or empty string)"""
+    rng = random.Random(seed)
+    records = []
+    for index in range(count):
+        firstname, lastname = rng.choice(FIRSTNAMES), rng.choice(LASTNAMES)
+        record = {
+            'username': f'{firstname}{index}',
+            'email': f'{firstname.lower()}.{lastname.lower()}{index}@{rng.choice(DOMAINS)}',
+            'firstname': firstname,
+            'lastname': lastname,
+            'birthday': (date(1950, 1, 1) + timedelta(days=rng.randrange(20000))).isoformat(),
+            'telephone_number': ''.join(rng.choice(string.digits) for _ in range(9)),
+            'another_id': str(rng.randrange(10 ** 6)),
+            'another_id2': str(rng.randrange(10 ** 6)),
+            'hashed_password': ''.join(rng.choice(string.hexdigits) for _ in range(16)),
+        }
+        if rng.random() < invalid_ratio:
+            broken = rng.choice(('email', 'birthday', 'hashed_password'))
+            record[broken] = {'email': 'no-at-sign.de', 'birthday': '2999-01-01', 'hashed_password': ''}[broken]
+        records.append(record)
+    return records
+
+
+def orders(count: int, invalid_ratio: float = 0.1, seed: int = 42) -> List[Dict[str, Any]]:
+    """Nested records for ORDER_RULES, every order embeds a customer"""
+    rng = random.Random(seed)
+    records = []
+    for index, customer in enumerate(customers(count, invalid_ratio, seed)):
+        records.append({
+            'order_id': f'O-{index}',
+            'customer': customer,
+            'shipping': {
+                'street': f'Street {rng.randrange(1, 200)}',
+                'zip': str(rng.randrange(10000, 99999)),
+                'country': {'code': 'DE', 'name': 'Germany' if rng.random() > invalid_ratio else ''},
+            },
+            'payment': {
+                'amount': round(rng.uniform(1, 500), 2) if rng.random() > invalid_ratio else -1,
+                'paid': rng.random() > 0.5,
+                'callback': f'https://shop.example.com/orders/{index}',
+            },
+            'gender': rng.choice(list(Gender)).value,
+        })
+    return records
+
+
+def rows(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Flat rows for the database workloads"""
+    rng = random.Random(seed)
+    return [
+        {'id': index, 'name': f'name {index}', 'amount': round(rng.uniform(0, 1000), 2), 'flag': index % 2}
+        for index in range(count)
+    ]
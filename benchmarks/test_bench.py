@@ -0,0 +1,29 @@
+from bench import CASES, compare, main, run
+
+
+def test_every_case_runs_once():
+    results = run(['*'], scales=[20], min_time=0, min_iterations=1)['results']
+
+    assert sorted(result['name'] for result in results.values()) == sorted(CASES)
+    assert all(result['iterations'] >= 1 and result['throughput'] > 0 for result in results.values())
+
+
+def test_compare():
+    def results(throughput, peak_memory):
+        return {'results': {'case[10]': {'throughput': throughput, 'peak_memory': peak_memory}}}
+
+    baseline = results(1000.0, 1024 * 1024)
+    assert compare(results(850.0, 1024 * 1024), baseline) == []
+    assert compare(results(700.0, 1024 * 1024 + 32 * 1024), baseline, memory_threshold=0.0)[0].startswith(
+        'case[10]: throughput 700/s')
+    assert len(compare(results(1000.0, 2 * 1024 * 1024), baseline)) == 1
+    assert compare(results(1.0, 0), {'results': {}}) == []
+
+
+def test_main_saves_and_compares(tmp_path, capsys):
+    baseline = str(tmp_path / 'baseline.json')
+    arguments = ['validator.validate', '--records', '10', '--min-time', '0', '--min-iterations', '1']
+
+    assert main(arguments + ['--save', baseline]) == 0
+    assert main(arguments + ['--compare', baseline, '--threshold', '1.0']) == 0
+    assert 'no regressions' in capsys.readouterr().out
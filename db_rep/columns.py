@@ -0,0 +1,114 @@
+import datetime
+from decimal import Decimal
+from typing import Any, Iterable, Sequence
+
+try:
+    import numpy
+except ImportError:  # numpy is optional, without it every column is a list
+    numpy = None
+
+_NUMBERS = (int, float, Decimal)
+_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=datetime.timezone.utc)
+_EPOCH_DAY = _EPOCH.toordinal()
+_MICROSECOND = datetime.timedelta(microseconds=1)
+_NAT = -(2 ** 63)  # int64 representation of NaT
+
+
+class ColumnBuilder:
+    """Collects chunks of row tuples into one column per result column
+
+    Every chunk is converted on arrival, so only the compact columns and one chunk of row
+    tuples are in memory at a time. With numpy, columns of numbers become int64 / float64 arrays
+    (float64 with NaN if the column has NULLs, or if it holds any float or Decimal), booleans bool arrays, datetimes
+    datetime64[us] (timezone aware values as UTC) and dates datetime64[D], with NaT for NULLs.
+    Strings and anything else stay lists.
+
+    :param names: column names of the result
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.names = list(names)
+        self._parts: list[list[Any]] = [[] for _ in self.names]
+
+    def add(self, rows: Sequence[Sequence[Any]]):
+        if not rows:
+            return
+        for parts, values in zip(self._parts, zip(*rows)):
+            parts.append(_convert(values))
+
+    def extend(self, chunks: Iterable[Sequence[Sequence[Any]]]) -> "ColumnBuilder":
+        for rows in chunks:
+            self.add(rows)
+        return self
+
+    def build(self) -> dict[str, Any]:
+        return {name: _concatenate(parts) for name, parts in zip(self.names, self._parts)}
+
+
+class _Nulls:
+    """A chunk in which a column is only NULL, materialized with the dtype of the other chunks"""
+
+    __slots__ = ("size",)
+
+    def __init__(self, size: int):
+        self.size = size
+
+
+def _convert(values: tuple) -> Any:
+    sample = next((value for value in values if value is not None), None)
+    if sample is None:
+        return _Nulls(len(values))
+    if numpy is None:
+        return list(values)
+
+    has_nulls = None in values
+    kind = type(sample)
+    try:
+        if kind is bool:
+            if not has_nulls and all(type(value) is bool for value in values):
+                return numpy.array(values, dtype=bool)
+        elif isinstance(sample, _NUMBERS) and not isinstance(sample, bool):
+            if kind is int and not has_nulls and all(type(value) is int for value in values):
+                return numpy.array(values, dtype=numpy.int64)
+            if all(value is None or (isinstance(value, _NUMBERS) and type(value) is not bool) for value in values):
+                return numpy.array([numpy.nan if value is None else value for value in values], dtype=numpy.float64)
+        elif kind is datetime.datetime:
+            # integer arithmetic is several times faster than numpy parsing datetime objects
+            epoch = _EPOCH if sample.tzinfo is None else _EPOCH_UTC
+            microseconds = ((value - epoch) // _MICROSECOND if value is not None else _NAT for value in values)
+            return numpy.fromiter(microseconds, numpy.int64, len(values)).view("datetime64[us]")
+        elif kind is datetime.date:
+            days = (value.toordinal() - _EPOCH_DAY if value is not None else _NAT for value in values)
+            return numpy.fromiter(days, numpy.int64, len(values)).view("datetime64[D]")
+    except (TypeError, ValueError, OverflowError):
+        pass  # mixed types or out of range, kept as list
+    return list(values)
+
+
+def _concatenate(parts: list[Any]) -> Any:
+    if numpy is not None and all(isinstance(part, (numpy.ndarray, _Nulls)) for part in parts):
+        arrays = [part for part in parts if isinstance(part, numpy.ndarray)]
+        try:
+            dtype = numpy.result_type(*arrays) if arrays else None
+        except TypeError:
+            dtype = None  # e.g. numbers in one chunk and dates in another
+        if dtype is not None and len(arrays) < len(parts) and dtype.kind in "iu":
+            dtype = numpy.dtype(numpy.float64)
+        if dtype is not None and (len(arrays) == len(parts) or dtype.kind in "fM"):
+            if len(parts) == 1:
+                return parts[0]
+            null = numpy.nan if dtype.kind == "f" else numpy.datetime64("NaT")
+            return numpy.concatenate(
+                [numpy.full(part.size, null, dtype) if isinstance(part, _Nulls) else part for part in parts]
+            ).astype(dtype, copy=False)
+
+    column = []
+    for part in parts:
+        if isinstance(part, _Nulls):
+            column.extend([None] * part.size)
+        elif numpy is not None and isinstance(part, numpy.ndarray):
+            column.extend(part.tolist())
+        else:
+            column.extend(part)
+    return column
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+# the psycopg2 tests need a postgres server, e.g. TEST_PG_HOST=localhost TEST_PG_USER=postgres python -m pytest
+PG_SETTINGS = {
+    "host": os.environ.get("TEST_PG_HOST"),
+    "db_name": os.environ.get("TEST_PG_DB", "postgres"),
+    "username": os.environ.get("TEST_PG_USER", "postgres"),
+    "password": os.environ.get("TEST_PG_PASSWORD", ""),
+}
+
+
+@pytest.fixture
+def pg_settings():
+    if not PG_SETTINGS["host"]:
+        pytest.skip("TEST_PG_HOST is not set")
+    pytest.importorskip("psycopg2")
+    return dict(PG_SETTINGS)
@@ -1,12 +1,25 @@
+import asyncio
+import atexit
 import logging
+import threading
+import time
 from urllib import parse
 from abc import ABC, abstractmethod
-from contextlib import suppress
-from dataclasses import dataclass
-from typing import Optional, Any, Protocol, NamedTuple
+from contextlib import asynccontextmanager, contextmanager, suppress
+from dataclasses import astuple, dataclass
+from typing import Optional, Any, Protocol, NamedTuple, Iterator, Union, AsyncIterator, Callable
 
-from sqlalchemy import create_engine, MetaData
-from sqlalchemy.engine import Engine, Connection, URL
+from sqlalchemy import create_engine, event, MetaData, text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.engine import Engine, Connection, URL, make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+from sqlalchemy.sql import Executable, TextClause
+
+from columns import ColumnBuilder
+from instrumentation import Instrument, StatementObservation
+from query_cache import QueryCache, is_read
+from unit_of_work import StatementFailure, UnitOfWork
 
 
 class SQLTables(Protocol):
@@ -35,12 +48,44 @@ class DBCredentials(NamedTuple):
         )
 
 
+@dataclass(kw_only=True)
 class DBConfig(ABC):
+    """Base of the typed configs, holds the connection pool settings shared by all backends
+
+    The pool settings are keyword only and left out of create_engine() while None, so the
+    dialect defaults apply (e.g. sqlite in memory does not accept max_overflow).
+    """
+
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_timeout: Optional[float] = None
+    pool_recycle: Optional[int] = None
+    pool_pre_ping: bool = False
+
     @property
     @abstractmethod
     def connection_string(self) -> str:
         NotImplementedError()
 
+    @property
+    def engine_options(self) -> dict[str, Any]:
+        """Keyword arguments for create_engine() built from the pool settings"""
+        options = {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+        }
+        options = {key: value for key, value in options.items() if value is not None}
+        if self.pool_pre_ping:
+            options["pool_pre_ping"] = True
+        return options
+
+    @property
+    def registry_key(self) -> tuple:
+        """Hashable identity of the config, equal configs share an engine"""
+        return type(self), astuple(self)
+
 
 @dataclass
 class DBConfigSQLite(DBConfig):
@@ -124,6 +169,206 @@ class DBConfigPostgreSQL(DBConfig):
         )
 
 
+class EngineRegistry:
+    """Process wide cache of engines keyed by config
+
+    Creating an engine builds a complete connection pool. Handles for the same config
+    therefore share one engine and its warm pool instead of creating and disposing it
+    on every context. Engines live until dispose() is called, at the latest on interpreter exit.
+    """
+
+    def __init__(self):
+        self._engines: dict[tuple, Engine] = {}
+        self._lock = threading.Lock()
+
+    def get(self, config: DBConfig, logger: Optional[logging.Logger] = None) -> Engine:
+        """Return the engine for config, creating it on first use"""
+        key = config.registry_key
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = self._engines[key] = create_engine(config.connection_string, **config.engine_options)
+                (logger or logging.getLogger(__name__)).info(f"Creating Engine for {config=}")
+            return engine
+
+    def dispose(self, config: Optional[DBConfig] = None) -> int:
+        """Dispose the engine of config or all engines if no config is given
+
+        :return: number of disposed engines
+        """
+        with self._lock:
+            if config is None:
+                engines = list(self._engines.values())
+                self._engines.clear()
+            else:
+                engine = self._engines.pop(config.registry_key, None)
+                engines = [engine] if engine is not None else []
+        for engine in engines:
+            engine.dispose()
+        return len(engines)
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Pool status of every registered engine"""
+        with self._lock:
+            engines = list(self._engines.values())
+        return [{"url": engine.url.render_as_string(), "pool": engine.pool.status()} for engine in engines]
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+    def __contains__(self, config: DBConfig) -> bool:
+        return config.registry_key in self._engines
+
+
+engines = EngineRegistry()
+atexit.register(engines.dispose)
+
+
+def dispose_engines(config: Optional[DBConfig] = None) -> int:
+    """Shutdown hook, disposes the shared engines (of one config or all of them)"""
+    return engines.dispose(config)
+
+
+class Replica:
+    """Routing state of one replica"""
+
+    def __init__(self, config: DBConfig, engine: Engine):
+        self.config = config
+        self.engine = engine
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string()
+
+    def is_available(self, now: float) -> bool:
+        """Healthy, or ejected long enough to get a trial request"""
+        return self.ejected_until is None or self.ejected_until <= now
+
+
+class ReplicaRouter:
+    """Routes reads over replicas with round robin or least outstanding requests
+
+    A replica is ejected for eject_seconds after max_failures consecutive connection failures,
+    afterwards a single trial request decides whether it comes back. If no replica is available
+    the reads fall back to the primary. A router can be shared by many handles, its stats then
+    cover all of them:
+
+    >>> router = ReplicaRouter([DBConfigSQLite("replica1.db"), DBConfigSQLite("replica2.db")])
+    >>> with RDBMHandle(DBConfigSQLite("primary.db"), replicas=router) as db:
+    >>>     rows = db.query("select * from users")
+
+    :param replicas: configs of the replicas
+    :param strategy: ROUND_ROBIN or LEAST_OUTSTANDING
+    :param max_failures: consecutive connection failures until a replica is ejected
+    :param eject_seconds: time an ejected replica gets no requests
+    """
+
+    ROUND_ROBIN = "round_robin"
+    LEAST_OUTSTANDING = "least_outstanding"
+
+    def __init__(
+        self,
+        replicas: list[DBConfig],
+        strategy: str = ROUND_ROBIN,
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+        logger: Optional[logging.Logger] = None,
+    ):
+        if strategy not in (self.ROUND_ROBIN, self.LEAST_OUTSTANDING):
+            raise ValueError(f"unknown routing strategy {strategy}")
+        self.logger = logger if logger else logging.getLogger(__name__)
+        self.replicas = [Replica(config, engines.get(config, self.logger)) for config in replicas]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.decisions = {"replica": 0, "sticky": 0, "fallback": 0}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def choose(self) -> Optional[Replica]:
+        """Reserve a replica for one request (release() it afterwards), None if no replica is available"""
+        now = time.monotonic()
+        with self._lock:
+            available = [replica for replica in self.replicas if replica.is_available(now)]
+            if not available:
+                return None
+            if self.strategy == self.LEAST_OUTSTANDING:
+                replica = min(available, key=lambda candidate: (candidate.outstanding, candidate.requests))
+            else:
+                replica = available[self._next % len(available)]
+                self._next += 1
+            if replica.ejected_until is not None:
+                # trial request, the replica stays out of rotation until it succeeded
+                replica.ejected_until = now + self.eject_seconds
+            replica.outstanding += 1
+            replica.requests += 1
+            return replica
+
+    def release(self, replica: Replica, error: Optional[BaseException] = None):
+        """Return the reservation, a connection error counts towards the ejection"""
+        with self._lock:
+            replica.outstanding -= 1
+            if error is None:
+                replica.consecutive_failures = 0
+                replica.ejected_until = None
+                return
+            replica.failures += 1
+            replica.consecutive_failures += 1
+            replica.last_error = repr(error)
+            if replica.consecutive_failures >= self.max_failures:
+                replica.ejected_until = time.monotonic() + self.eject_seconds
+        if replica.ejected_until is not None:
+            self.logger.warning(f"replica {replica.name} ejected for {self.eject_seconds}s : {error!r}")
+
+    def record(self, decision: str):
+        with self._lock:
+            self.decisions[decision] += 1
+
+    def check_health(self) -> dict[str, bool]:
+        """Ping every replica, healthy replicas are taken back into rotation immediately"""
+        health = {}
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    conn.execute(text("select 1"))
+            except DBAPIError as e:
+                with self._lock:
+                    replica.failures += 1
+                    replica.last_error = repr(e)
+                    replica.ejected_until = time.monotonic() + self.eject_seconds
+                health[replica.name] = False
+            else:
+                with self._lock:
+                    replica.consecutive_failures = 0
+                    replica.ejected_until = None
+                health[replica.name] = True
+        return health
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "strategy": self.strategy,
+                "decisions": dict(self.decisions),
+                "replicas": [
+                    {
+                        "name": replica.name,
+                        "requests": replica.requests,
+                        "outstanding": replica.outstanding,
+                        "failures": replica.failures,
+                        "ejected": replica.ejected_until is not None,
+                        "last_error": replica.last_error,
+                    }
+                    for replica in self.replicas
+                ],
+            }
+
+
 class RDBMHandle:
     """Wrapper for Database Connectivity
 
@@ -132,9 +377,27 @@ class RDBMHandle:
     >>> with RDBMHandle(DBConfigSQLite()) as db:
     >>>     result = db.conn.execute('select 1').fetchall()
 
+    Engines are taken from the shared registry, leaving the context only returns the connection
+    to the pool. Use dispose_engines() to shut the pools down, or shared_engine=False for an engine
+    private to the handle that is disposed on exit (e.g. a fresh sqlite in memory database per test).
+
+    Reads through query() are served from query_cache when one is given. Writes executed on
+    the connection invalidate the cached results of the tables they touch once they are committed,
+    until then query() bypasses the cache so uncommitted rows are never shared.
+
+    With replicas, query(), stream() and fetch_columns() run on a replica chosen by a ReplicaRouter,
+    self.conn and everything else stays on the primary. After a write on self.conn the reads go to
+    the primary for sticky_seconds (read your writes), and as long as the write is not committed.
+
     :param config: dbconfig object specific to the backend
     :param tables: a tables object for sqlalchemy
     :param logger: if needed, a provided logger can be injected
+    :param shared_engine: take the engine from the process wide registry
+    :param query_cache: optional result cache for query()
+    :param instrument: optional instrumentation.Instrument receiving statement and checkout timings
+    :param replicas: replica configs or a ReplicaRouter, e.g. to share it between handles
+    :param routing: strategy for replica configs, ReplicaRouter.ROUND_ROBIN or ReplicaRouter.LEAST_OUTSTANDING
+    :param sticky_seconds: time reads stay on the primary after a write, None disables the stickiness
     """
 
     logger: logging.Logger
@@ -150,8 +413,25 @@ class RDBMHandle:
         tables: Optional[SQLTables] = None,
         logger: Optional[logging.Logger] = None,
         schema_map: Optional[dict[str, dict[str, Any]]] = None,
+        shared_engine: bool = True,
+        query_cache: Optional[QueryCache] = None,
+        instrument: Optional[Instrument] = None,
+        replicas: Optional[Union[list[DBConfig], ReplicaRouter]] = None,
+        routing: str = ReplicaRouter.ROUND_ROBIN,
+        sticky_seconds: Optional[float] = 1.0,
     ):
         self.logger = logger if logger else logging.getLogger(__name__)
+        self.shared_engine = shared_engine
+        self.query_cache = query_cache
+        self.instrument = instrument
+        # write statements of the open transaction, their tables are invalidated on commit
+        self._written: set[str] = set()
+        if isinstance(replicas, list):
+            replicas = ReplicaRouter(replicas, routing, logger=self.logger) if replicas else None
+        self.router = replicas
+        self.sticky_seconds = sticky_seconds
+        self._last_write: Optional[float] = None
+        self._uncommitted_write = False
         self.engine = self._get_engine(config)
         self.tables = tables
         if schema_map:
@@ -165,20 +445,258 @@ class RDBMHandle:
         :param configs: config dataclass customized to the database target
         :return: prepared engine ready for connection
         """
+        if self.shared_engine:
+            return engines.get(configs, self.logger)
         self.logger.info(f"Creating Engine for {configs=}")
-        engine = create_engine(configs.connection_string)
+        engine = create_engine(configs.connection_string, **configs.engine_options)
         return engine
 
     def connect(self) -> Connection:
         """Start the connection for prepared engine"""
-        if self.engine.dialect.name in self.schema_map:
-            self.conn = self.engine.connect().execution_options(
-                schema_translate_map=self.schema_map[self.engine.dialect.name]
-            )
-        else:
-            self.conn = self.engine.connect()
+        self.conn = self._open_connection()
+        if self.query_cache is not None or self.router is not None:
+            event.listen(self.conn, "after_cursor_execute", self._after_write)
+            event.listen(self.conn, "commit", self._committed)
+            event.listen(self.conn, "rollback", self._rolled_back)
         return self.conn
 
+    def _open_connection(self, engine: Optional[Engine] = None) -> Connection:
+        engine = engine if engine is not None else self.engine
+        start = time.perf_counter()
+        conn = engine.connect()
+        if self.instrument is not None:
+            self.instrument.on_checkout(time.perf_counter() - start)
+            instrument_connection(conn, self.instrument)
+        if engine.dialect.name in self.schema_map:
+            conn = conn.execution_options(schema_translate_map=self.schema_map[engine.dialect.name])
+        return conn
+
+    @contextmanager
+    def read_connection(self, read: bool = True) -> Iterator[Connection]:
+        """Connection for read-only work: a replica, or self.conn without replicas or while reads stick to the primary
+
+        Connection failures of a replica count towards its ejection, the read is then retried on the
+        next replica and finally on the primary. With read=False (a write) the connection is self.conn.
+        """
+        if self.router is None or not read:
+            yield self.conn
+            return
+        if self._sticky():
+            self.router.record("sticky")
+            yield self.conn
+            return
+
+        for _ in range(len(self.router.replicas)):
+            replica = self.router.choose()
+            if replica is None:
+                break
+            try:
+                conn = self._open_connection(replica.engine)
+            except (OperationalError, InterfaceError) as e:
+                self.router.release(replica, e)
+                continue
+            self.router.record("replica")
+            error = None
+            try:
+                with conn:
+                    yield conn
+            except DBAPIError as e:
+                error = e if e.connection_invalidated else None
+                raise
+            finally:
+                self.router.release(replica, error)
+            return
+
+        self.router.record("fallback")
+        yield self.conn
+
+    def _sticky(self) -> bool:
+        if self._uncommitted_write:
+            return True
+        return (
+            self.sticky_seconds is not None
+            and self._last_write is not None
+            and time.monotonic() - self._last_write < self.sticky_seconds
+        )
+
+    def routing_stats(self) -> Optional[dict[str, Any]]:
+        """Routing decisions and per replica load, None without replicas"""
+        return self.router.stats() if self.router is not None else None
+
+    def unit_of_work(
+        self,
+        max_statements: int = 500,
+        max_delay: Optional[float] = 1.0,
+        on_failure: Optional[Callable[[list[StatementFailure]], Any]] = None,
+        background: bool = False,
+    ) -> UnitOfWork:
+        """Group commit: queued writes are committed together, see unit_of_work.UnitOfWork
+
+        Batches are written on a connection of their own, not on self.conn. Engines with a single
+        connection per thread (an in-memory sqlite database) would hand out the connection of self.conn
+        and commit its transaction, there the batches are written on self.conn: committed if it has no
+        transaction in progress, otherwise inside a savepoint and committed with the transaction of
+        self.conn. The timer thread is not supported on such engines.
+        """
+        if background and self._single_connection:
+            raise ValueError("a background unit of work needs an engine with a connection pool")
+        return UnitOfWork(self._write_batch, max_statements, max_delay, on_failure, background)
+
+    @property
+    def _single_connection(self) -> bool:
+        return isinstance(self.engine.pool, (SingletonThreadPool, StaticPool))
+
+    def _write_batch(self, statements: list[tuple[Any, Any]], isolate: bool) -> list[tuple[int, Exception]]:
+        failures = []
+        if self._single_connection:
+            with self.conn.begin_nested() if self.conn.in_transaction() else self.conn.begin():
+                self._execute_batch(self.conn, statements, isolate, failures)
+        else:
+            with self._open_connection() as conn, conn.begin():
+                self._execute_batch(conn, statements, isolate, failures)
+        # the batch is committed, reads stick to the primary as after a write on self.conn
+        self._last_write = time.monotonic()
+        if self.query_cache is not None:
+            for statement, _ in statements:
+                self.query_cache.invalidate(str(statement))
+        return failures
+
+    @staticmethod
+    def _execute_batch(
+        conn: Connection, statements: list[tuple[Any, Any]], isolate: bool, failures: list[tuple[int, Exception]]
+    ):
+        for index, (statement, parameters) in enumerate(statements):
+            statement = _statement(statement)
+            if not isolate:
+                conn.execute(statement, parameters)
+                continue
+            try:
+                with conn.begin_nested():
+                    conn.execute(statement, parameters)
+            except DBAPIError as e:
+                failures.append((index, e))
+
+    def query(
+        self, statement: Union[str, Executable], parameters: Optional[dict] = None, mappings: bool = False
+    ) -> list[Any]:
+        """Fetch all rows of a read, through the query cache if the handle has one
+
+        :param statement: SQL string or SQLAlchemy statement
+        :param parameters: bound parameters of the statement
+        :param mappings: return dict-like mappings instead of tuple-like rows
+        """
+
+        def fetch() -> list[Any]:
+            with self.read_connection(_is_read(statement)) as conn, self._counting(conn) as observation:
+                result = conn.execute(_statement(statement), parameters or {})
+                rows = (result.mappings() if mappings else result).all()
+                observation.rows = len(rows)
+                return rows
+
+        if self.query_cache is None:
+            return fetch()
+        sql, key_parameters = statement, parameters
+        if not isinstance(statement, str):
+            compiled = statement.compile(dialect=self.engine.dialect)
+            sql, key_parameters = str(compiled), {**compiled.params, **(parameters or {})}
+        if not is_read(sql) or self._uncommitted_write:
+            # reads inside a write transaction may see uncommitted rows, they must not reach the shared cache
+            return fetch()
+        return self.query_cache.lookup(sql, key_parameters, fetch, scope=(self.engine.url, mappings))
+
+    def _after_write(self, conn, cursor, statement, parameters, context, executemany):
+        if is_read(statement):
+            return
+        self._last_write = time.monotonic()
+        self._uncommitted_write = True
+        if self.query_cache is not None:
+            self._written.add(statement)
+
+    def _committed(self, conn):
+        if self._written:
+            for statement in self._written:
+                self.query_cache.invalidate(statement)
+            self._written.clear()
+        if self._uncommitted_write:
+            self._uncommitted_write = False
+            self._last_write = time.monotonic()
+
+    def _rolled_back(self, conn):
+        self._uncommitted_write = False
+        self._written.clear()
+
+    def stream(
+        self,
+        statement: Union[str, Executable],
+        parameters: Optional[dict] = None,
+        yield_per: int = 1000,
+        mappings: bool = False,
+    ) -> Iterator[Any]:
+        """Iterate over a result without buffering it, rows are fetched in chunks of yield_per
+
+        Uses a server-side cursor where the driver supports it:
+
+        >>> with RDBMHandle(config) as db:
+        >>>     for row in db.stream("select * from big_table", yield_per=5000):
+        >>>         ...
+
+        :param statement: SQL string or SQLAlchemy statement
+        :param parameters: bound parameters of the statement
+        :param yield_per: number of rows fetched per round trip
+        :param mappings: yield dict-like mappings instead of tuple-like rows
+        """
+        with self.read_connection(_is_read(statement)) as conn, self._counting(conn) as observation:
+            result = conn.execute(_statement(statement), parameters or {}, execution_options={"yield_per": yield_per})
+            observation.rows = 0
+            try:
+                for row in result.mappings() if mappings else result:
+                    observation.rows += 1
+                    yield row
+            finally:
+                result.close()
+
+    def fetch_columns(
+        self, statement: Union[str, Executable], parameters: Optional[dict] = None, chunk_size: int = 10000
+    ) -> dict[str, Any]:
+        """Column oriented result {name: column}, numbers and dates as numpy arrays, see columns.ColumnBuilder
+
+        Rows are fetched chunk_size at a time (server-side where the driver supports it) and
+        converted chunk by chunk instead of materializing all rows first.
+        """
+        with self.read_connection(_is_read(statement)) as conn, self._counting(conn) as observation:
+            result = conn.execute(_statement(statement), parameters or {}, execution_options={"yield_per": chunk_size})
+            try:
+                columns = ColumnBuilder(list(result.keys())).extend(result.partitions(chunk_size)).build()
+            finally:
+                result.close()
+            observation.rows = len(next(iter(columns.values()), ()))
+            return columns
+
+    @contextmanager
+    def _counting(self, conn: Connection) -> Iterator[StatementObservation]:
+        """Report a read executed in the block with the rows fetched by the handle instead of the driver rowcount
+
+        The rowcount is -1 for reads on most drivers, so instrument_connection leaves reporting the
+        statement to the end of the block, its time includes fetching the rows.
+        """
+        observation = StatementObservation()
+        if self.instrument is None:
+            yield observation
+            return
+        conn.info["count_rows"] = True
+        error = None
+        try:
+            yield observation
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            conn.info.pop("count_rows", None)
+            deferred = conn.info.pop("deferred_statement", None)
+            if deferred is not None:
+                statement, start = deferred
+                self.instrument.on_statement(statement, time.perf_counter() - start, observation.rows, error)
+
     def __enter__(self):
         self.connect()
         return self
@@ -186,4 +704,176 @@ class RDBMHandle:
     def __exit__(self, exc_type, exc_val, exc_tb):
         with suppress(AttributeError):
             self.conn.close()
-            self.engine.dispose()
+            if not self.shared_engine:
+                self.engine.dispose()
+
+
+def instrument_connection(conn: Connection, instrument: Instrument):
+    """Report every statement executed on conn to instrument, rows are the rowcount of the driver
+
+    Reads of RDBMHandle methods fetching the rows are reported by the handle with the fetched rows.
+    """
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append((time.perf_counter(), instrument))
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        start, _ = conn.info["query_start"].pop()
+        if conn.info.pop("count_rows", False):
+            conn.info["deferred_statement"] = (statement, start)
+            return
+        rows = cursor.rowcount if cursor.rowcount >= 0 else None
+        instrument.on_statement(statement, time.perf_counter() - start, rows, None)
+
+    event.listen(conn, "before_cursor_execute", before_execute)
+    event.listen(conn, "after_cursor_execute", after_execute)
+    # handle_error can only be registered per engine, it finds the instrument through the connection
+    if not event.contains(conn.engine, "handle_error", _report_error):
+        event.listen(conn.engine, "handle_error", _report_error)
+
+
+def _report_error(context):
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts and context.statement is not None:
+        start, instrument = starts.pop()
+        instrument.on_statement(context.statement, time.perf_counter() - start, None, context.original_exception)
+
+
+class AsyncRDBMHandle:
+    """asyncio counterpart of RDBMHandle on the SQLAlchemy async engine
+
+    The sync driver of the config is replaced by the async driver of the dialect (ASYNC_DRIVERS).
+    Every call checks a connection out for its own duration, at most max_concurrency calls
+    hold a connection at the same time, the others wait without blocking the event loop.
+    The handle is meant to live as long as the application, leaving the context disposes the engine:
+
+    >>> async with AsyncRDBMHandle(DBConfigSQLite()) as db:
+    >>>     await db.execute("insert into users values (:id)", {"id": 1})
+    >>>     rows = await db.fetch("select * from users")
+    >>>     async for row in db.stream("select * from big_table"):
+    >>>         ...
+
+    :param config: dbconfig object specific to the backend
+    :param tables: a tables object for sqlalchemy
+    :param logger: if needed, a provided logger can be injected
+    :param max_concurrency: number of calls allowed to use the database at the same time, 1 on engines with a single connection
+    :param instrument: optional instrumentation.Instrument, checkout timings include the concurrency limit wait
+    """
+
+    ASYNC_DRIVERS: dict[str, str] = {
+        "sqlite": "sqlite+aiosqlite",
+        "postgresql": "postgresql+asyncpg",
+        "mysql": "mysql+aiomysql",
+    }
+
+    logger: logging.Logger
+    tables: Optional[SQLTables]
+    engine: Optional[AsyncEngine] = None
+
+    schema_map: dict[str, dict[str, Any]] = {"sqlite": {"metadata": None}}
+
+    def __init__(
+        self,
+        config: DBConfig,
+        tables: Optional[SQLTables] = None,
+        logger: Optional[logging.Logger] = None,
+        schema_map: Optional[dict[str, dict[str, Any]]] = None,
+        max_concurrency: int = 10,
+        instrument: Optional[Instrument] = None,
+    ):
+        self.logger = logger if logger else logging.getLogger(__name__)
+        self.config = config
+        self.instrument = instrument
+        self.tables = tables
+        self.max_concurrency = max_concurrency
+        self._limit = asyncio.Semaphore(max_concurrency)
+        if schema_map:
+            self.schema_map = schema_map
+
+    def _get_engine(self, configs: DBConfig) -> AsyncEngine:
+        """Create the async engine for the async driver of the configured dialect"""
+        url = make_url(configs.connection_string)
+        backend = url.get_backend_name()
+        if backend not in self.ASYNC_DRIVERS:
+            raise ValueError(f"no async driver known for {backend}, extend {type(self).__name__}.ASYNC_DRIVERS")
+        self.logger.info(f"Creating async Engine for {configs=}")
+        return create_async_engine(url.set(drivername=self.ASYNC_DRIVERS[backend]), **configs.engine_options)
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[AsyncConnection]:
+        """Check out a connection within the concurrency limit, the transaction is committed on success"""
+        start = time.perf_counter()
+        async with self._limit:
+            async with self.engine.connect() as conn:
+                if self.instrument is not None:
+                    self.instrument.on_checkout(time.perf_counter() - start)
+                    instrument_connection(conn.sync_connection, self.instrument)
+                if self.engine.dialect.name in self.schema_map:
+                    await conn.execution_options(schema_translate_map=self.schema_map[self.engine.dialect.name])
+                async with conn.begin():
+                    yield conn
+
+    async def execute(self, statement: Union[str, Executable], parameters: Optional[Any] = None) -> int:
+        """Execute a write in its own transaction
+
+        :return: number of affected rows
+        """
+        async with self.connect() as conn:
+            result = await conn.execute(_statement(statement), parameters)
+            return result.rowcount
+
+    async def fetch(
+        self, statement: Union[str, Executable], parameters: Optional[dict] = None, mappings: bool = False
+    ) -> list[Any]:
+        """Fetch all rows of a read"""
+        async with self.connect() as conn:
+            result = await conn.execute(_statement(statement), parameters)
+            return (result.mappings() if mappings else result).all()
+
+    async def stream(
+        self,
+        statement: Union[str, Executable],
+        parameters: Optional[dict] = None,
+        yield_per: int = 1000,
+        mappings: bool = False,
+    ) -> AsyncIterator[Any]:
+        """Iterate over a result without buffering it, rows are fetched in chunks of yield_per
+
+        The connection stays checked out until the iteration ends.
+        """
+        async with self.connect() as conn:
+            result = await conn.stream(_statement(statement), parameters, execution_options={"yield_per": yield_per})
+            try:
+                async for row in result.mappings() if mappings else result:
+                    yield row
+            finally:
+                await result.close()
+
+    async def dispose(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+
+    async def __aenter__(self):
+        if self.engine is None:
+            self.engine = self._get_engine(self.config)
+            if isinstance(self.engine.pool, (SingletonThreadPool, StaticPool)):
+                # one shared DBAPI connection (in-memory sqlite), concurrent transactions would interleave on it
+                self._limit = asyncio.Semaphore(1)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.dispose()
+
+
+def _statement(statement: Union[str, Executable]) -> Executable:
+    return text(statement) if isinstance(statement, str) else statement
+
+
+def _is_read(statement: Union[str, Executable]) -> bool:
+    """Whether statement only reads, writes have to run on the primary"""
+    if isinstance(statement, str):
+        return is_read(statement)
+    if isinstance(statement, TextClause):
+        return is_read(statement.text)
+    return bool(getattr(statement, "is_select", False))
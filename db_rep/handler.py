@@ -1,24 +1,306 @@
 import psycopg2
 import psycopg2.extras
-from psycopg2 import errors
+import psycopg2.pool
+from psycopg2 import errors, sql
 
+import asyncio
+import datetime
+import json
 import logging
+import re
 import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque, namedtuple
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+from uuid import UUID, uuid4
+
+from columns import ColumnBuilder
+from instrumentation import observe
+from query_cache import is_read
+from unit_of_work import UnitOfWork
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
+class PoolTimeout(psycopg2.pool.PoolError):
+    pass
+
+
+BulkResult = namedtuple("BulkResult", ["rows", "batches", "seconds"])
+
+ROW_CURSOR_FACTORIES = {
+    "dict": psycopg2.extras.RealDictCursor,
+    "tuple": None,
+    "namedtuple": psycopg2.extras.NamedTupleCursor,
+}
+
+
+class ConnectionPool(object):
+    """Thread safe pool of DB-API connections
+
+    connect is called without arguments and returns a new connection, so the pool works with
+    psycopg2 as well as with any stub driver. Connections idle for longer than ping_after seconds
+    are checked with a "SELECT 1" before they are handed out, connections older than recycle
+    seconds are closed and replaced.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30.0, recycle=None, ping_after=30.0):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("invalid pool size min_size={} max_size={}".format(min_size, max_size))
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+
+        self._idle = deque()  # (connection, created, last_used)
+        self._created = {}  # id(connection) -> created
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.discarded = 0
+
+        for _ in range(min_size):
+            connection = self.connect()
+            self._size += 1
+            self._created[id(connection)] = time.monotonic()
+            self._idle.append((connection, self._created[id(connection)], time.monotonic()))
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise psycopg2.pool.PoolError("connection pool is closed")
+                    if self._idle:
+                        connection, created, last_used = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        connection = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout("no connection available within {}s".format(timeout))
+                    self._condition.wait(remaining)
+
+            if connection is None:
+                return self._open()
+            if self._is_usable(connection, created, last_used):
+                with self._condition:
+                    self.checkouts += 1
+                return connection
+            self._discard(connection)
+
+    def putconn(self, connection, discard=False):
+        if not discard and not getattr(connection, "closed", 0):
+            try:
+                # never hand out a connection with an open transaction
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        if discard or self._closed or getattr(connection, "closed", 0):
+            self._discard(connection)
+            return
+
+        with self._condition:
+            self._idle.append((connection, self._created.get(id(connection), time.monotonic()), time.monotonic()))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        connection = self.getconn(timeout)
+        try:
+            yield connection
+        finally:
+            # errors like QueryCanceled or SerializationFailure leave a healthy connection, putconn rolls
+            # it back and only discards it if it is closed (or the rollback fails)
+            self.putconn(connection)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._condition.notify_all()
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+            }
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._created[id(connection)] = time.monotonic()
+            self.checkouts += 1
+        return connection
+
+    def _is_usable(self, connection, created, last_used):
+        if getattr(connection, "closed", 0):
+            return False
+        now = time.monotonic()
+        if self.recycle is not None and now - created > self.recycle:
+            return False
+        if self.ping_after is not None and now - last_used > self.ping_after:
+            try:
+                cur = connection.cursor()
+                cur.execute("SELECT 1")
+                cur.close()
+                connection.rollback()
+            except Exception:
+                return False
+        return True
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._created.pop(id(connection), None)
+            self._size -= 1
+            self.discarded += 1
+            self._condition.notify()
+
+
+class PreparedStatementCache(object):
+    """LRU cache of server-side prepared statements of one connection, keyed on the SQL text
+
+    The SQL uses the psycopg2 placeholders (%s or %(name)s), they are translated to $1, $2, ... for PREPARE.
+    Postgres infers the parameter types from the statement, so an untyped "SELECT %s" returns text,
+    cast such parameters ("SELECT %s::int"). Only str scripts with scalar parameters are prepared
+    (see supports), composed sql objects and tuples, lists, dicts or adapters go through cur.execute.
+    """
+
+    PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+    SCALARS = (str, int, float, Decimal, bytes, UUID, datetime.date, datetime.time, datetime.timedelta)
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._statements = OrderedDict()  # sql -> (statement name, parameter names or None)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def supports(script, params):
+        if not isinstance(script, str) or not isinstance(params, (dict, list, tuple)):
+            return False
+        values = params.values() if isinstance(params, dict) else params
+        return all(value is None or isinstance(value, PreparedStatementCache.SCALARS) for value in values)
+
+    def execute(self, cur, script, params):
+        name, names = self.prepare(cur, script)
+        args = [params[n] for n in names] if names is not None else list(params)
+        if args:
+            cur.execute("EXECUTE {} ({})".format(name, ", ".join(["%s"] * len(args))), args)
+        else:
+            cur.execute("EXECUTE {}".format(name))
+
+    def prepare(self, cur, script):
+        entry = self._statements.get(script)
+        if entry is not None:
+            self._statements.move_to_end(script)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        body, names = PreparedStatementCache.to_positional(script)
+        entry = ("ps_{}".format(uuid4().hex), names)
+        cur.execute("PREPARE {} AS {}".format(entry[0], body))
+        self._statements[script] = entry
+
+        if len(self._statements) > self.maxsize:
+            _, (evicted, _) = self._statements.popitem(last=False)
+            cur.execute("DEALLOCATE {}".format(evicted))
+            self.evictions += 1
+        return entry
+
+    @staticmethod
+    def to_positional(script):
+        names = []
+        positional = [0]
+
+        def replace(match):
+            if match.group(0) == "%%":
+                return "%"
+            if match.group(1) is None:
+                positional[0] += 1
+                return "${}".format(positional[0])
+            if match.group(1) not in names:
+                names.append(match.group(1))
+            return "${}".format(names.index(match.group(1)) + 1)
+
+        body = PreparedStatementCache.PLACEHOLDER.sub(replace, script)
+        if names and positional[0]:
+            raise ValueError("mixed %s and %(name)s placeholders are not supported")
+        return body, names if names else None
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._statements)}
+
+
 class DatabaseHandler(object):
-    def __init__(self, host, db_name, username, password):
+    def __init__(self, host, db_name, username, password, pool_min_size=None, pool_max_size=None,
+                 pool_timeout=30.0, pool_recycle=None, statement_cache_size=0, query_cache=None,
+                 instrument=None):
         self.DB_CONNECTION = {
             "db_host": host,
             "db_name": db_name,
             "db_username": username,
             "db_password": password,
         }
+        # opt-in number of server-side prepared statements per connection, see PreparedStatementCache
+        self.statement_cache_size = statement_cache_size
+        self._statement_caches = weakref.WeakKeyDictionary()
+        self._statement_caches_lock = threading.Lock()
+        # optional query_cache.QueryCache, run_query results are served from it
+        self.query_cache = query_cache
+        # optional instrumentation.Instrument, e.g. QueryMetrics, receives statement and checkout timings
+        self.instrument = instrument
 
-        self.connection = self.get_conn()
+        if pool_max_size is None:
+            self.pool = None
+            self.connection = self.get_conn()
+        else:
+            self.pool = ConnectionPool(
+                self.get_conn,
+                min_size=1 if pool_min_size is None else pool_min_size,
+                max_size=pool_max_size,
+                timeout=pool_timeout,
+                recycle=pool_recycle,
+            )
+            self.connection = None
 
     def get_conn(self):
         return DatabaseHandler.create_conn(
@@ -43,11 +325,11 @@ class DatabaseHandler(object):
         return connection
 
     @staticmethod
-    def execute_update(con, cur, script):
+    def execute_update(con, cur, script, params=None, statements=None):
         UniqueViolation = errors.lookup("23505")
 
         try:
-            cur.execute(script)
+            DatabaseHandler.execute(cur, script, params, statements)
             con.commit()
             result = True
         except UniqueViolation as e:
@@ -61,11 +343,11 @@ class DatabaseHandler(object):
         return result
 
     @staticmethod
-    def execute_query(con, cur, script):
+    def execute_query(con, cur, script, params=None, statements=None):
         InvalidTextViolation = errors.lookup("22P02")
 
         try:
-            cur.execute(script)
+            DatabaseHandler.execute(cur, script, params, statements)
             con.commit()
             result = cur.fetchall()
         except InvalidTextViolation as e:
@@ -78,17 +360,386 @@ class DatabaseHandler(object):
 
         return result
 
-    def run_update(self, script):
-        con = self.connection
-        return DatabaseHandler.execute_update(con, con.cursor(), script)
+    @staticmethod
+    def execute(cur, script, params=None, statements=None):
+        if statements is not None and params is not None and PreparedStatementCache.supports(script, params):
+            statements.execute(cur, script, params)
+        else:
+            cur.execute(script, params)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        if self.pool is None:
+            if self.instrument is not None:
+                self.instrument.on_checkout(0.0)
+            yield self.connection
+        else:
+            start = time.perf_counter()
+            with self.pool.connection(timeout) as con:
+                if self.instrument is not None:
+                    self.instrument.on_checkout(time.perf_counter() - start)
+                yield con
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+        elif self.connection is not None:
+            self.connection.close()
+
+    def run_update(self, script, params=None):
+        try:
+            with self.checkout() as con, observe(self.instrument, script) as observation:
+                cur = con.cursor()
+                result = DatabaseHandler.execute_update(con, cur, script, params, self._statements(con, params))
+                observation.rows = cur.rowcount
+                return result
+        finally:
+            if self.query_cache is not None:
+                self.query_cache.invalidate(script)
+
+    def run_query(self, script, params=None):
+        if self.query_cache is None:
+            return self._run_query(script, params)
+        if is_read(script):
+            return self.query_cache.lookup(
+                script, params, lambda: self._run_query(script, params),
+                scope=(self.DB_CONNECTION["db_host"], self.DB_CONNECTION["db_name"])
+            )
+        # e.g. INSERT ... RETURNING, always executed and invalidating like run_update
+        try:
+            return self._run_query(script, params)
+        finally:
+            self.query_cache.invalidate(script)
+
+    def _run_query(self, script, params):
+        with self.checkout() as con, observe(self.instrument, script) as observation:
+            result = DatabaseHandler.execute_query(
+                con, con.cursor(cursor_factory=psycopg2.extras.RealDictCursor), script, params,
+                self._statements(con, params)
+            )
+            observation.rows = len(result)
+            return result
+
+    def statement_cache_stats(self):
+        with self._statement_caches_lock:
+            caches = list(self._statement_caches.values())
+        stats = {"connections": len(caches), "hits": 0, "misses": 0, "evictions": 0, "size": 0}
+        for cache in caches:
+            for key, value in cache.stats().items():
+                stats[key] += value
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
 
-    def run_query(self, script):
-        con = self.connection
-        return DatabaseHandler.execute_query(
-            con, con.cursor(cursor_factory=psycopg2.extras.RealDictCursor), script
+    def _statements(self, con, params):
+        # only parameterized statements are prepared, plain scripts may contain several statements
+        if params is None or not self.statement_cache_size:
+            return None
+        with self._statement_caches_lock:
+            cache = self._statement_caches.get(con)
+            if cache is None:
+                cache = self._statement_caches[con] = PreparedStatementCache(self.statement_cache_size)
+        return cache
+
+    def unit_of_work(self, max_statements=500, max_delay=1.0, on_failure=None, background=False):
+        """Group commit: queued run_update-style writes are committed together, see unit_of_work.UnitOfWork
+
+        Without a pool the batches are written and committed on self.connection, so the timer thread
+        (background=True) needs a pool, it would commit the caller's transaction at any time.
+        """
+        if background and self.pool is None:
+            raise ValueError("a background unit of work needs a connection pool (pool_max_size)")
+        return UnitOfWork(self._write_batch, max_statements, max_delay, on_failure, background)
+
+    def _write_batch(self, statements, isolate):
+        failures = []
+        with self.checkout() as con:
+            cur = con.cursor()
+            try:
+                for index, (script, params) in enumerate(statements):
+                    if not isolate:
+                        with observe(self.instrument, script) as observation:
+                            DatabaseHandler.execute(cur, script, params, self._statements(con, params))
+                            observation.rows = cur.rowcount
+                        continue
+                    cur.execute("SAVEPOINT unit_of_work")
+                    try:
+                        with observe(self.instrument, script) as observation:
+                            DatabaseHandler.execute(cur, script, params, self._statements(con, params))
+                            observation.rows = cur.rowcount
+                    except psycopg2.Error as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT unit_of_work")
+                        failures.append((index, e))
+                    else:
+                        cur.execute("RELEASE SAVEPOINT unit_of_work")
+                con.commit()
+            except Exception as e:
+                con.rollback()
+                raise e
+            finally:
+                if self.query_cache is not None:
+                    for script, _ in statements:
+                        self.query_cache.invalidate(script)
+        return failures
+
+    def stream_query(self, script, itersize=2000, rows="dict"):
+        """Iterate over the result of a query through a server-side cursor, fetching itersize rows at a time
+
+        The connection stays checked out until the iterator is exhausted or closed.
+        """
+        cursor_factory = ROW_CURSOR_FACTORIES[rows]
+        with self.checkout() as con:
+            cur = con.cursor(name="stream_{}".format(uuid4().hex), cursor_factory=cursor_factory)
+            cur.itersize = itersize
+            try:
+                # reported once the stream ends, with the fetch time and the rows handed out
+                with observe(self.instrument, script) as observation:
+                    cur.execute(script)
+                    observation.rows = 0
+                    try:
+                        for row in cur:
+                            observation.rows += 1
+                            yield row
+                    except GeneratorExit:
+                        pass  # closed early by the consumer, not an error of the statement
+                cur.close()
+                con.commit()
+            except BaseException:
+                con.rollback()
+                raise
+
+    def fetch_columns(self, script, params=None, chunk_size=10000):
+        """Column oriented result {name: column}, numbers and dates as numpy arrays, see columns.ColumnBuilder
+
+        Rows are fetched through a server-side cursor chunk_size at a time and converted chunk by chunk.
+        """
+        with self.checkout() as con:
+            cur = con.cursor(name="columns_{}".format(uuid4().hex))
+            cur.itersize = chunk_size
+            try:
+                with observe(self.instrument, script) as observation:
+                    cur.execute(script, params)
+                    rows = cur.fetchmany(chunk_size)
+                    builder = ColumnBuilder([column.name for column in cur.description])
+                    observation.rows = 0
+                    while rows:
+                        builder.add(rows)
+                        observation.rows += len(rows)
+                        rows = cur.fetchmany(chunk_size)
+                cur.close()
+                con.commit()
+            except BaseException:
+                con.rollback()
+                raise
+        return builder.build()
+
+    def insert_many(self, table, rows, columns=None, batch_size=1000):
+        """Insert rows (dicts or sequences) with multi-row INSERT ... VALUES statements, one commit per batch"""
+        rows = iter(rows)
+        batch, columns = DatabaseHandler._first_batch(rows, columns, batch_size)
+        if not batch:
+            return BulkResult(0, 0, 0.0)
+        total, batches, start = 0, 0, time.perf_counter()
+
+        with self.checkout() as con, self._invalidating(table):
+            while batch:
+                statement = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+                    DatabaseHandler._identifier(table), sql.SQL(", ").join(map(sql.Identifier, columns))
+                )
+                with observe(self.instrument, self._statement_text(statement, con)) as observation:
+                    DatabaseHandler.execute_batch(
+                        con, con.cursor(), lambda cur: psycopg2.extras.execute_values(
+                            cur, statement, DatabaseHandler._row_values(batch, columns), page_size=len(batch)
+                        )
+                    )
+                    observation.rows = len(batch)
+                total += len(batch)
+                batches += 1
+                batch = list(islice(rows, batch_size))
+
+        return BulkResult(total, batches, time.perf_counter() - start)
+
+    def copy_from(self, table, rows, columns=None, batch_size=10000):
+        """Stream rows (dicts or sequences) through COPY ... FROM STDIN, one COPY and commit per batch"""
+        rows = iter(rows)
+        batch, columns = DatabaseHandler._first_batch(rows, columns, batch_size)
+        if not batch:
+            return BulkResult(0, 0, 0.0)
+        total, batches, start = 0, 0, time.perf_counter()
+        statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            DatabaseHandler._identifier(table), sql.SQL(", ").join(map(sql.Identifier, columns))
         )
 
+        with self.checkout() as con, self._invalidating(table):
+            while batch:
+                buffer = CopyBuffer(DatabaseHandler._row_values(batch, columns))
+                with observe(self.instrument, self._statement_text(statement, con)) as observation:
+                    DatabaseHandler.execute_batch(con, con.cursor(), lambda cur: cur.copy_expert(statement, buffer))
+                    observation.rows = len(batch)
+                total += len(batch)
+                batches += 1
+                batch = list(islice(rows, batch_size))
+
+        return BulkResult(total, batches, time.perf_counter() - start)
+
+    def _statement_text(self, statement, con):
+        return statement.as_string(con) if self.instrument is not None else None
+
+    @contextmanager
+    def _invalidating(self, table):
+        try:
+            yield
+        finally:
+            if self.query_cache is not None:
+                self.query_cache.invalidate_tables([table])
+
+    @staticmethod
+    def execute_batch(con, cur, write):
+        try:
+            write(cur)
+            con.commit()
+        except Exception as e:
+            con.rollback()
+            raise e
+
+    @staticmethod
+    def _first_batch(rows, columns, batch_size):
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return batch, columns
+        if columns is None:
+            if not isinstance(batch[0], dict):
+                raise ValueError("columns are required for rows that are not dicts")
+            columns = list(batch[0])
+        return batch, list(columns)
+
+    @staticmethod
+    def _row_values(batch, columns):
+        if batch and isinstance(batch[0], dict):
+            return [tuple(row.get(column) for column in columns) for row in batch]
+        return batch
+
+    @staticmethod
+    def _identifier(table):
+        return sql.Identifier(*table.split("."))
+
+
+class AsyncDatabaseHandler(object):
+    """asyncio front of a pooled DatabaseHandler, the blocking psycopg2 calls run on a bounded executor
+
+    max_concurrency is the number of executor threads and the size of the connection pool, further
+    calls wait for a free thread without blocking the event loop.
+
+        async with AsyncDatabaseHandler(host, db_name, username, password) as db:
+            rows = await db.run_query("SELECT * FROM users WHERE id = %s", (1,))
+    """
+
+    def __init__(self, host, db_name, username, password, max_concurrency=10, **options):
+        options.setdefault("pool_max_size", max_concurrency)
+        self.handler = DatabaseHandler(host, db_name, username, password, **options)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="db")
+
+    async def run(self, function, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(function, *args, **kwargs))
+
+    async def run_update(self, script, params=None):
+        return await self.run(self.handler.run_update, script, params)
+
+    async def run_query(self, script, params=None):
+        return await self.run(self.handler.run_query, script, params)
+
+    async def insert_many(self, table, rows, columns=None, batch_size=1000):
+        return await self.run(self.handler.insert_many, table, rows, columns, batch_size)
+
+    async def copy_from(self, table, rows, columns=None, batch_size=10000):
+        return await self.run(self.handler.copy_from, table, rows, columns, batch_size)
+
+    async def stream_query(self, script, itersize=2000, rows="dict"):
+        """Async iteration over stream_query, every executor call fetches the next itersize rows"""
+        result = self.handler.stream_query(script, itersize, rows)
+        try:
+            while True:
+                chunk = await self.run(lambda: list(islice(result, itersize)))
+                for row in chunk:
+                    yield row
+                if len(chunk) < itersize:
+                    break
+        finally:
+            await self.run(result.close)
+
+    async def close(self):
+        await self.run(self.handler.close)
+        self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
 
 
+class CopyBuffer(object):
+    """File like object that encodes rows on demand in the COPY text format"""
 
+    def __init__(self, rows):
+        self._lines = (CopyBuffer.encode_row(row) for row in rows)
+        self._buffer = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    @staticmethod
+    def encode_row(row):
+        return ("\t".join(CopyBuffer.encode_value(value) for value in row) + "\n").encode()
 
+    @staticmethod
+    def encode_value(value):
+        """COPY text of a value, adapted like psycopg2 adapts it for INSERT"""
+        if value is None:
+            return "\\N"
+        return (
+            CopyBuffer.text(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+
+    @staticmethod
+    def text(value):
+        """Postgres input text of a value: lists become array literals, dicts and Json json, bytes bytea hex"""
+        if isinstance(value, bool):
+            return "t" if value else "f"
+        if isinstance(value, str):
+            return value
+        if isinstance(value, (int, float, Decimal, UUID)):
+            return str(value)
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, datetime.timedelta):
+            return "{} days {} seconds {} microseconds".format(value.days, value.seconds, value.microseconds)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return "\\x" + bytes(value).hex()
+        if isinstance(value, psycopg2.extras.Json):
+            return value.dumps(value.adapted)
+        if isinstance(value, dict):
+            return json.dumps(value)
+        if isinstance(value, list):
+            return "{" + ",".join(CopyBuffer.array_element(element) for element in value) + "}"
+        raise TypeError("can not encode {} for COPY".format(type(value).__name__))
+
+    @staticmethod
+    def array_element(value):
+        if value is None:
+            return "NULL"
+        if isinstance(value, list):
+            return CopyBuffer.text(value)
+        return '"' + CopyBuffer.text(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
@@ -0,0 +1,175 @@
+import json
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, IO, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# literals and placeholders become ?, so statements differing only in values share their stats
+_LITERALS = re.compile(
+    r"'(?:[^']|'')*'"  # string literal
+    r"|\$\d+|%\(\w+\)s|%s|(?<![\w:]):\w+"  # placeholders of the drivers and of sqlalchemy text()
+    r"|(?<![\w.])-?\d+(?:\.\d+)?(?:e[-+]?\d+)?\b",  # numbers, not digits inside identifiers
+    re.IGNORECASE,
+)
+_VALUE_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize(statement: str) -> str:
+    """Statement with literals replaced by ?, value lists collapsed to (?) and whitespace squeezed"""
+    statement = _LITERALS.sub("?", statement)
+    statement = _VALUE_LISTS.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class Instrument:
+    """Receives the timings of a handler, subclass and override what is needed
+
+    Handlers take it as instrument=..., every executed statement calls on_statement,
+    every connection checkout calls on_checkout with the time waited for the connection.
+    """
+
+    def on_statement(self, statement: str, seconds: float, rows: Optional[int], error: Optional[BaseException]):
+        pass
+
+    def on_checkout(self, seconds: float):
+        pass
+
+
+class StatementObservation:
+    """Mutable rows count filled in by the handler while a statement is observed"""
+
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows = None
+
+
+@contextmanager
+def observe(instrument: Optional[Instrument], statement: Any) -> Iterator[StatementObservation]:
+    """Time the block and report it to instrument (if any) as one execution of statement"""
+    observation = StatementObservation()
+    if instrument is None:
+        yield observation
+        return
+    start = time.perf_counter()
+    try:
+        yield observation
+    except BaseException as e:
+        instrument.on_statement(str(statement), time.perf_counter() - start, observation.rows, e)
+        raise
+    instrument.on_statement(str(statement), time.perf_counter() - start, observation.rows, None)
+
+
+class QueryMetrics(Instrument):
+    """Latency histograms, row and error counts per normalized statement, checkout waits and a slow-query log
+
+    Statements slower than slow_query_seconds are logged as warning and the last slow_query_log_size
+    of them are kept for the snapshot.
+
+    >>> metrics = QueryMetrics(slow_query_seconds=0.5)
+    >>> db = DatabaseHandler(host, db_name, username, password, instrument=metrics)
+    >>> metrics.dump("db_metrics.json")
+    """
+
+    # upper bounds in seconds of the histogram buckets, the last bucket holds everything above
+    BUCKETS = (1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 1e-1, 5e-1, 1.0, 5.0)
+
+    def __init__(self, slow_query_seconds: Optional[float] = 1.0, slow_query_log_size: int = 100):
+        self.slow_query_seconds = slow_query_seconds
+        self.statements: dict[str, _StatementStats] = {}
+        self.checkouts = _StatementStats(len(self.BUCKETS) + 1)
+        self.slow_queries: deque[dict[str, Any]] = deque(maxlen=slow_query_log_size)
+        self._lock = threading.Lock()
+
+    def on_statement(self, statement: str, seconds: float, rows: Optional[int], error: Optional[BaseException]):
+        key = normalize(statement)
+        bucket = bisect_left(self.BUCKETS, seconds)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = _StatementStats(len(self.BUCKETS) + 1)
+            stats.add(seconds, bucket, rows, error is not None)
+            if self.slow_query_seconds is not None and seconds >= self.slow_query_seconds:
+                self.slow_queries.append({
+                    "statement": statement,
+                    "seconds": seconds,
+                    "rows": rows,
+                    "error": repr(error) if error is not None else None,
+                    "at": time.time(),
+                })
+        if self.slow_query_seconds is not None and seconds >= self.slow_query_seconds:
+            logger.warning(f"slow query : {seconds:.3f}s, rows={rows} : {statement}")
+
+    def on_checkout(self, seconds: float):
+        with self._lock:
+            self.checkouts.add(seconds, bisect_left(self.BUCKETS, seconds), None, False)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "buckets": list(self.BUCKETS),
+                "statements": [
+                    dict(statement=statement, **stats.as_dict())
+                    for statement, stats in sorted(self.statements.items(), key=lambda item: -item[1].seconds)
+                ],
+                "checkouts": self.checkouts.as_dict(),
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def dump(self, target: Union[str, IO]):
+        """Write the snapshot as JSON to a path or an open text file"""
+        if isinstance(target, str):
+            with open(target, "w") as file:
+                json.dump(self.snapshot(), file, indent=2)
+        else:
+            json.dump(self.snapshot(), target, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.checkouts = _StatementStats(len(self.BUCKETS) + 1)
+            self.slow_queries.clear()
+
+
+class _StatementStats:
+    __slots__ = ("calls", "errors", "rows", "seconds", "max_seconds", "histogram")
+
+    def __init__(self, buckets: int):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.histogram = [0] * buckets
+
+    def add(self, seconds: float, bucket: int, rows: Optional[int], error: bool):
+        self.calls += 1
+        self.errors += error
+        if rows is not None and rows > 0:
+            self.rows += rows
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.histogram[bucket] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "seconds": self.seconds,
+            "mean_seconds": self.seconds / self.calls if self.calls else 0.0,
+            "max_seconds": self.max_seconds,
+            "histogram": list(self.histogram),
+        }
@@ -0,0 +1,186 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+# table references following FROM / JOIN of a read, a FROM list with its aliases ("from a x, b as y")
+# is matched as a whole and split by table_names()
+_ALIAS = (
+    r'(?:\s+(?:as\s+)?(?!(?:join|inner|left|right|full|cross|natural|on|using|where|group|order|having|limit|offset|'
+    r'union|intersect|except|window|returning|for)\b)[\w"]+)?'
+)
+READ_TABLES = re.compile(
+    rf'\b(?:from|join)\s+([\w."]+{_ALIAS}(?:\s*,\s*[\w."]+{_ALIAS})*)',
+    re.IGNORECASE,
+)
+# the target table of a write
+WRITE_TABLES = re.compile(
+    r'\b(?:insert\s+(?:or\s+\w+\s+)?into|replace\s+into|update|delete\s+from|truncate(?:\s+table)?|'
+    r'(?:alter|drop|create)\s+table(?:\s+if\s+(?:not\s+)?exists)?|copy|merge\s+into)\s+(?:only\s+)?([\w."]+)',
+    re.IGNORECASE,
+)
+READ_KEYWORDS = frozenset(("select", "with", "values", "show", "explain", "pragma", "describe"))
+# data modifying CTEs ("with x as (delete ...)"), explain analyze of writes and row locks of a read
+WRITING = re.compile(r'\b(?:insert|update|delete|merge)\b|\bfor\s+(?:no\s+key\s+)?(?:update|share)\b', re.IGNORECASE)
+
+
+def is_read(statement: str) -> bool:
+    """Whether statement starts like a read and writes nothing, anything else is treated as a write
+
+    A read mentioning a write keyword anywhere (e.g. in a string literal) is treated as a write too.
+    """
+    words = statement.lstrip(" \t\r\n(").split(None, 1)
+    return bool(words) and words[0].lower() in READ_KEYWORDS and not WRITING.search(statement)
+
+
+def table_names(pattern: re.Pattern, statement: str) -> frozenset[str]:
+    """Lower case table names matched by pattern, schema prefixes, aliases and quotes are dropped"""
+    return frozenset(
+        reference.split()[0].replace('"', "").rsplit(".", 1)[-1].lower()
+        for match in pattern.findall(statement)
+        for reference in match.split(",")
+    )
+
+
+class QueryCache:
+    """Opt-in cache of query results keyed on SQL text plus parameters
+
+    Entries expire after ttl seconds and the least recently used entry is evicted above maxsize.
+    Every entry remembers the tables its query reads, a write invalidates the entries of the
+    tables it touches. Writes whose table cannot be determined clear the whole cache, reads whose
+    tables cannot be determined are not cached. Tables behind views or functions are not known,
+    such results are only refreshed by the ttl.
+
+    Cached results are shared between callers and have to be treated as read only.
+
+    >>> cache = QueryCache(maxsize=1000, ttl=30)
+    >>> with RDBMHandle(DBConfigSQLite(), query_cache=cache) as db:
+    >>>     db.query("select * from users where id = :id", {"id": 1})
+
+    :param maxsize: maximum number of cached results
+    :param ttl: seconds a result stays valid, None keeps it until evicted or invalidated
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, frozenset[str], Any]] = OrderedDict()
+        self._by_table: dict[str, set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # bumped by every invalidation, a result computed across one is not stored
+        self._generation = 0
+
+    def lookup(self, statement: str, parameters: Any, compute: Callable[[], Any], scope: Hashable = None) -> Any:
+        """Return the cached result of statement or store the result of compute()
+
+        :param statement: SQL text, used for the key and the table dependencies
+        :param parameters: bound parameters, unhashable parameters bypass the cache
+        :param compute: runs the query on a miss
+        :param scope: separates equal statements against different databases
+        """
+        try:
+            key = (scope, statement, self.freeze(parameters))
+            hash(key)
+        except TypeError:
+            return compute()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            generation = self._generation
+
+        result = compute()
+        tables = table_names(READ_TABLES, statement)
+        expires = now + self.ttl if self.ttl is not None else float("inf")
+
+        with self._lock:
+            if generation != self._generation or not tables:
+                return result
+            self._remove(key)
+            self._entries[key] = (expires, tables, result)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return result
+
+    def invalidate(self, statement: str) -> int:
+        """Drop the entries depending on the tables written by statement
+
+        :return: number of dropped entries
+        """
+        tables = table_names(WRITE_TABLES, statement)
+        if not tables:
+            return self.clear()
+        return self.invalidate_tables(tables)
+
+    def invalidate_tables(self, tables: Iterable[str]) -> int:
+        """Drop the entries depending on any of the given tables"""
+        dropped = 0
+        with self._lock:
+            self._generation += 1
+            for table in tables:
+                for key in list(self._by_table.get(table.replace('"', "").rsplit(".", 1)[-1].lower(), ())):
+                    self._remove(key)
+                    dropped += 1
+            self.invalidations += dropped
+        return dropped
+
+    def clear(self) -> int:
+        with self._lock:
+            self._generation += 1
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._by_table.clear()
+            self.invalidations += dropped
+        return dropped
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+            }
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[1]:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    @staticmethod
+    def freeze(parameters: Any) -> Hashable:
+        """Hashable form of bound parameters (mapping, sequence or scalar)"""
+        if parameters is None:
+            return None
+        if isinstance(parameters, dict):
+            return tuple(sorted((key, QueryCache.freeze(value)) for key, value in parameters.items()))
+        if isinstance(parameters, (list, tuple)):
+            return tuple(QueryCache.freeze(value) for value in parameters)
+        return parameters
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from db_handler import AsyncRDBMHandle, DBConfigSQLite  # noqa: E402
+
+
+async def insert_concurrently(config, count):
+    async with AsyncRDBMHandle(config) as db:
+        await db.execute("create table t (id integer primary key)")
+        await asyncio.gather(*(db.execute("insert into t values (:id)", {"id": index}) for index in range(count)))
+        return await db.fetch("select count(*) from t"), [row async for row in db.stream("select id from t", yield_per=7)]
+
+
+def test_concurrent_writes_in_memory():
+    count, rows = asyncio.run(insert_concurrently(DBConfigSQLite(), 50))
+    assert count == [(50,)]
+    assert len(rows) == 50
+
+
+def test_concurrent_writes_on_file(tmp_path):
+    count, _ = asyncio.run(insert_concurrently(DBConfigSQLite(str(tmp_path / "async.db")), 50))
+    assert count == [(50,)]
+
+
+def test_unknown_dialect():
+    class Config(DBConfigSQLite):
+        @property
+        def connection_string(self) -> str:
+            return "oracle://user@host/db"
+
+    with pytest.raises(ValueError):
+        asyncio.run(AsyncRDBMHandle(Config()).__aenter__())
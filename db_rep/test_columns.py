@@ -0,0 +1,53 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from columns import ColumnBuilder
+from db_handler import DBConfigSQLite, RDBMHandle
+
+numpy = pytest.importorskip("numpy")
+
+
+def build(*chunks):
+    return ColumnBuilder(["v"]).extend(chunks).build()["v"]
+
+
+def test_numbers():
+    assert build([(1,), (2,)]).dtype == numpy.int64
+    assert build([(1,), (2.7,)]).tolist() == [1.0, 2.7]
+    assert build([(Decimal("1.5"),), (2,)]).dtype == numpy.float64
+    mixed = build([(1,), (2,)], [(None,), (3,)])
+    assert mixed.dtype == numpy.float64 and numpy.isnan(mixed[2])
+
+
+def test_bools_strings_and_mixed_types():
+    assert build([(True,), (False,)]).dtype == bool
+    assert build([(1,), (True,)]) == [1, True]
+    assert build([("a",), (None,)]) == ["a", None]
+    assert build([(1,), ("x",)]) == [1, "x"]
+
+
+def test_dates():
+    moments = build([(datetime.datetime(2024, 1, 1, 12),), (None,)])
+    assert moments.dtype == numpy.dtype("datetime64[us]")
+    assert moments[0] == numpy.datetime64("2024-01-01T12:00:00") and numpy.isnat(moments[1])
+    aware = build([(datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),)])
+    assert aware[0] == numpy.datetime64("2024-01-01T10:00:00")
+    assert build([(datetime.date(2024, 1, 2),)])[0] == numpy.datetime64("2024-01-02")
+
+
+def test_null_chunks():
+    assert build([(None,), (None,)], [(1,)]).tolist()[2] == 1.0
+    assert build([(None,)]) == [None]
+
+
+def test_fetch_columns_on_sqlite():
+    with RDBMHandle(DBConfigSQLite(), shared_engine=False) as db:
+        db.conn.execute(text("create table a (id integer, amount integer, name text)"))
+        db.conn.execute(text("insert into a values (1, 1, 'x'), (2, 2.7, null), (3, null, 'z')"))
+        columns = db.fetch_columns("select * from a order by id", chunk_size=2)
+    assert columns["id"].tolist() == [1, 2, 3]
+    assert columns["amount"][:2].tolist() == [1.0, 2.7] and numpy.isnan(columns["amount"][2])
+    assert columns["name"] == ["x", None, "z"]
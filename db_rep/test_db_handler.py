@@ -0,0 +1,48 @@
+from sqlalchemy import text
+
+from db_handler import DBConfigSQLite, EngineRegistry, RDBMHandle, engines
+
+
+def test_stream(tmp_path):
+    with RDBMHandle(DBConfigSQLite(str(tmp_path / "stream.db")), shared_engine=False) as db:
+        db.conn.execute(text("create table a (id integer primary key, v text)"))
+        db.conn.execute(text("insert into a values (:id, :v)"), [{"id": i, "v": str(i)} for i in range(25)])
+        db.conn.commit()
+
+        assert [row.id for row in db.stream("select id from a order by id", yield_per=10)] == list(range(25))
+        assert next(db.stream(text("select * from a where id = :id"), {"id": 3}, mappings=True)) == {"id": 3, "v": "3"}
+
+        rows = db.stream("select id from a order by id", yield_per=10)
+        assert next(rows).id == 0
+        rows.close()  # the result is closed and the connection usable again
+        assert db.query("select count(*) from a") == [(25,)]
+
+
+def test_engine_registry(tmp_path):
+    registry = EngineRegistry()
+    first, second = DBConfigSQLite(str(tmp_path / "a.db")), DBConfigSQLite(str(tmp_path / "b.db"))
+
+    engine = registry.get(first)
+    assert registry.get(DBConfigSQLite(str(tmp_path / "a.db"))) is engine
+    assert registry.get(second) is not engine
+    assert (len(registry), first in registry) == (2, True)
+    assert [stats["url"] for stats in registry.stats()] == [str(engine.url), str(registry.get(second).url)]
+
+    assert registry.dispose(first) == 1
+    assert first not in registry and registry.get(first) is not engine
+    assert registry.dispose() == 2
+    assert len(registry) == 0
+
+
+def test_handles_share_the_registered_engine(tmp_path):
+    config = DBConfigSQLite(str(tmp_path / "shared.db"))
+    try:
+        with RDBMHandle(config) as db:
+            shared = db.engine
+        with RDBMHandle(config) as db:
+            assert db.engine is shared is engines.get(config)
+        with RDBMHandle(config, shared_engine=False) as db:
+            assert db.engine is not shared
+    finally:
+        engines.dispose(config)
+    assert config not in engines
@@ -0,0 +1,158 @@
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from handler import ConnectionPool  # noqa: E402
+
+
+class StubConnection:
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+
+    def rollback(self):
+        if self.closed:
+            raise psycopg2.InterfaceError("connection already closed")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+def test_pool_keeps_connection_after_query_error():
+    pool = ConnectionPool(StubConnection, min_size=0, max_size=1)
+    with pytest.raises(psycopg2.errors.QueryCanceled):
+        with pool.connection() as first:
+            raise psycopg2.errors.QueryCanceled("canceling statement due to statement timeout")
+    with pool.connection() as second:
+        pass
+    assert second is first
+    assert first.rollbacks == 2
+    assert pool.stats()["discarded"] == 0
+
+
+def test_pool_discards_closed_connection():
+    pool = ConnectionPool(StubConnection, min_size=0, max_size=1)
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as first:
+            first.close()
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+    with pool.connection() as second:
+        pass
+    assert second is not first
+    assert pool.stats()["discarded"] == 1
+
+
+def test_copy_encoding():
+    from handler import CopyBuffer
+
+    assert CopyBuffer.encode_value(None) == "\\N"
+    assert CopyBuffer.encode_value("a\tb\\c") == "a\\tb\\\\c"
+    assert CopyBuffer.encode_value([1, None, "x y", '"q"']) == '{"1",NULL,"x y","\\\\"q\\\\""}'
+    assert CopyBuffer.encode_value([[1, 2], [3, 4]]) == '{{"1","2"},{"3","4"}}'
+    assert CopyBuffer.encode_value({"a": [1, 2]}) == '{"a": [1, 2]}'
+    assert CopyBuffer.encode_value(psycopg2.extras.Json({"a": 1})) == '{"a": 1}'
+    assert CopyBuffer.encode_value(b"\x00\xff") == "\\\\x00ff"
+    with pytest.raises(TypeError):
+        CopyBuffer.encode_value(object())
+
+
+def test_copy_from_matches_insert_many(pg_settings):
+    from handler import DatabaseHandler
+
+    handler = DatabaseHandler(**pg_settings, pool_max_size=2)
+    handler.run_update("DROP TABLE IF EXISTS test_copy")
+    handler.run_update("CREATE TABLE test_copy (id int, tags text[], matrix int[][], doc jsonb, data bytea, note text)")
+    rows = [
+        (1, ["a", "b c", None, 'q"uote'], [[1, 2], [3, 4]], psycopg2.extras.Json({"k": [1, "v"]}), b"\x00\x01\xff", "x\ty\n"),
+        (2, [], None, None, None, None),
+    ]
+    try:
+        handler.insert_many("test_copy", rows, columns=["id", "tags", "matrix", "doc", "data", "note"])
+        handler.copy_from("test_copy", [(row[0] + 10,) + row[1:] for row in rows],
+                          columns=["id", "tags", "matrix", "doc", "data", "note"])
+        result = handler.run_query("SELECT tags, matrix, doc, encode(data, 'hex') AS data, note FROM test_copy ORDER BY id")
+        assert result[0] == result[2] and result[1] == result[3]
+        assert result[0]["tags"] == ["a", "b c", None, 'q"uote']
+        assert result[0]["data"] == "0001ff"
+    finally:
+        handler.run_update("DROP TABLE IF EXISTS test_copy")
+        handler.close()
+
+
+@pytest.fixture
+def prepared(pg_settings):
+    from handler import DatabaseHandler
+
+    handler = DatabaseHandler(**pg_settings, statement_cache_size=8)
+    yield handler
+    handler.close()
+
+
+def test_prepared_statements_are_reused(prepared):
+    for value in range(3):
+        assert prepared.run_query("SELECT %(v)s::int AS v", {"v": value}) == [{"v": value}]
+    assert prepared.statement_cache_stats()["hits"] == 2
+
+
+def test_prepared_statements_skip_tuples_and_composed_sql(prepared):
+    assert prepared.run_query("SELECT 2 AS v WHERE 2 IN %s", ((1, 2),)) == [{"v": 2}]
+    script = psycopg2.sql.SQL("SELECT {} AS v WHERE %s").format(psycopg2.sql.Literal(1))
+    assert prepared.run_query(script, (True,)) == [{"v": 1}]
+    assert prepared.run_query("SELECT %s::jsonb AS v", (psycopg2.extras.Json({"a": 1}),)) == [{"v": {"a": 1}}]
+    assert prepared.statement_cache_stats()["misses"] == 0
+
+
+def test_statement_cache_is_opt_in(pg_settings):
+    from handler import DatabaseHandler
+
+    handler = DatabaseHandler(**pg_settings)
+    try:
+        # an untyped parameter keeps the type of the python value without PREPARE
+        assert handler.run_query("SELECT %s AS v", (1,)) == [{"v": 1}]
+        assert handler.statement_cache_stats()["connections"] == 0
+    finally:
+        handler.close()
+
+
+class Recorder:
+    def __init__(self):
+        self.statements = []
+
+    def on_statement(self, statement, seconds, rows, error):
+        self.statements.append((statement, rows, error))
+
+    def on_checkout(self, seconds):
+        pass
+
+
+def test_stream_query_reports_fetched_rows(pg_settings):
+    from handler import DatabaseHandler
+
+    recorder = Recorder()
+    handler = DatabaseHandler(**pg_settings, instrument=recorder)
+    try:
+        script = "SELECT generate_series(1, 25) AS n"
+        assert len(list(handler.stream_query(script, itersize=10))) == 25
+        stream = handler.stream_query(script, itersize=10)
+        next(stream)
+        stream.close()
+        assert recorder.statements == [(script, 25, None), (script, 1, None)]
+    finally:
+        handler.close()
+
+
+def test_stream_query_row_types(pg_settings):
+    from handler import DatabaseHandler
+
+    handler = DatabaseHandler(**pg_settings, pool_max_size=1, pool_timeout=1.0)
+    try:
+        script = "SELECT n, n * 2 AS double FROM generate_series(1, 5) AS n"
+        assert list(handler.stream_query(script, itersize=2, rows="tuple")) == [(n, n * 2) for n in range(1, 6)]
+        assert [row.double for row in handler.stream_query(script, rows="namedtuple")] == [2, 4, 6, 8, 10]
+        stream = handler.stream_query(script)
+        assert next(stream) == {"n": 1, "double": 2}
+        stream.close()
+        assert handler.pool.stats()["in_use"] == 0  # the closed stream returned its connection
+    finally:
+        handler.close()
@@ -0,0 +1,40 @@
+import io
+import json
+
+import pytest
+from sqlalchemy import text
+
+from db_handler import DBConfigSQLite, RDBMHandle
+from instrumentation import QueryMetrics, normalize
+
+
+def test_normalize():
+    assert normalize("select *  from a where id = 5 and name = 'x''y'") == "select * from a where id = ? and name = ?"
+    assert normalize("insert into a values (1, 2), (3, 4)") == "insert into a values (?), (?)"
+    assert normalize("select * from t1 where id = :id") == "select * from t1 where id = ?"
+
+
+def test_metrics_of_rdbm_handle():
+    metrics = QueryMetrics(slow_query_seconds=0.0, slow_query_log_size=2)
+    with RDBMHandle(DBConfigSQLite(), instrument=metrics, shared_engine=False) as db:
+        db.conn.execute(text("create table a (id integer primary key)"))
+        db.conn.execute(text("insert into a values (1), (2), (3)"))
+        assert len(db.query("select id from a where id > 1")) == 2
+        assert len(list(db.stream("select id from a", yield_per=2))) == 3
+        assert len(db.fetch_columns("select id from a")["id"]) == 3
+        with pytest.raises(Exception):
+            db.query("select * from missing")
+
+    statements = {entry["statement"]: entry for entry in metrics.snapshot()["statements"]}
+    assert statements[normalize("insert into a values (1), (2), (3)")]["rows"] == 3
+    assert statements["select id from a where id > ?"]["rows"] == 2
+    assert statements["select id from a"] == {**statements["select id from a"], "calls": 2, "rows": 6}
+    assert statements["select * from missing"]["errors"] == 1
+    assert metrics.snapshot()["checkouts"]["calls"] == 1
+    assert len(metrics.snapshot()["slow_queries"]) == 2
+
+    buffer = io.StringIO()
+    metrics.dump(buffer)
+    assert json.loads(buffer.getvalue())["buckets"] == list(QueryMetrics.BUCKETS)
+    metrics.reset()
+    assert metrics.snapshot()["statements"] == []
@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import text
+
+from db_handler import DBConfigSQLite, RDBMHandle
+from query_cache import QueryCache, READ_TABLES, WRITE_TABLES, table_names
+
+
+@pytest.fixture
+def db(tmp_path):
+    cache = QueryCache(ttl=None)
+    with RDBMHandle(DBConfigSQLite(str(tmp_path / "cache.db")), query_cache=cache, shared_engine=False) as db:
+        db.conn.execute(text("create table a (id integer primary key, v integer)"))
+        db.conn.execute(text("create table b (id integer primary key, v integer)"))
+        db.conn.execute(text("insert into a values (1, 1)"))
+        db.conn.execute(text("insert into b values (1, 10)"))
+        db.conn.commit()
+        yield db
+
+
+def test_table_names():
+    assert table_names(READ_TABLES, "select * from a, b where a.id = b.id") == {"a", "b"}
+    assert table_names(READ_TABLES, 'select * from s.a x, "B" as y join c on c.id = x.id order by 1, 2') == {"a", "b", "c"}
+    assert table_names(READ_TABLES, "select * from a where id in (1, 2)") == {"a"}
+    assert table_names(WRITE_TABLES, "update b set v = 20") == {"b"}
+
+
+def test_hit(db):
+    statement = "select v from a where id = :id"
+    assert db.query(statement, {"id": 1}) == db.query(statement, {"id": 1}) == [(1,)]
+    assert db.query_cache.stats()["hits"] == 1
+
+
+def test_write_invalidates_every_table_of_a_from_list(db):
+    statement = "select b.v from a, b where a.id = b.id"
+    assert db.query(statement) == [(10,)]
+    db.conn.execute(text("update b set v = 20"))
+    db.conn.commit()
+    assert db.query(statement) == [(20,)]
+
+
+def test_join_and_other_tables(db):
+    statement = "select b.v from a join b on a.id = b.id"
+    assert db.query(statement) == [(10,)]
+    db.conn.execute(text("create table c (id integer)"))
+    db.conn.commit()
+    assert db.query_cache.stats()["size"] == 1
+    db.conn.execute(text("update b set v = 30"))
+    db.conn.commit()
+    assert db.query(statement) == [(30,)]
+
+
+def test_rollback_invalidates_results_read_in_the_transaction(db):
+    db.conn.execute(text("update a set v = 2"))
+    assert db.query("select v from a") == [(2,)]
+    db.conn.rollback()
+    assert db.query("select v from a") == [(1,)]
+
+
+def test_writes_are_not_cached(db):
+    statement = "insert into a (v) values (:v) returning id"
+    assert db.query(statement, {"v": 5}) != db.query(statement, {"v": 5})
+    db.conn.commit()
+    assert db.query("select count(*) from a") == [(3,)]
+
+
+def test_reads_without_known_table_are_not_cached(db):
+    db.query("select 1")
+    assert db.query_cache.stats()["size"] == 0
+
+
+def test_uncommitted_reads_are_not_shared(tmp_path):
+    cache = QueryCache(ttl=None)
+    config = DBConfigSQLite(str(tmp_path / "shared.db"))
+    with RDBMHandle(config, query_cache=cache) as writer, RDBMHandle(config, query_cache=cache) as reader:
+        writer.conn.execute(text("create table a (id integer primary key, v integer)"))
+        writer.conn.execute(text("insert into a values (1, 1)"))
+        writer.conn.commit()
+
+        writer.conn.execute(text("update a set v = 99"))
+        assert writer.query("select v from a") == [(99,)]
+        writer.conn.rollback()
+        assert reader.query("select v from a") == [(1,)]
+
+        writer.conn.execute(text("update a set v = 2"))
+        writer.conn.commit()
+        assert reader.query("select v from a") == [(2,)]
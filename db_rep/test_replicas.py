@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import text
+
+from db_handler import DBConfigSQLite, RDBMHandle, ReplicaRouter
+from query_cache import is_read
+
+
+@pytest.fixture
+def nodes(tmp_path):
+    configs = [DBConfigSQLite(str(tmp_path / f"{name}.db")) for name in ("primary", "replica1", "replica2")]
+    for config in configs:
+        with RDBMHandle(config, shared_engine=False) as db:
+            db.conn.execute(text("create table a (id integer primary key, node text)"))
+            db.conn.execute(text("insert into a (node) values (:node)"), {"node": config.filename.rsplit("/", 1)[-1]})
+            db.conn.commit()
+    return configs
+
+
+def count(config):
+    with RDBMHandle(config, shared_engine=False) as db:
+        return db.conn.execute(text("select count(*) from a")).scalar()
+
+
+def test_round_robin(nodes):
+    with RDBMHandle(nodes[0], replicas=nodes[1:]) as db:
+        assert [db.query("select node from a")[0][0] for _ in range(4)] == ["replica1.db", "replica2.db"] * 2
+        assert db.routing_stats()["decisions"] == {"replica": 4, "sticky": 0, "fallback": 0}
+
+
+def test_least_outstanding(nodes):
+    with RDBMHandle(nodes[0], replicas=nodes[1:], routing=ReplicaRouter.LEAST_OUTSTANDING) as db:
+        stream = db.stream("select node from a")
+        assert next(stream)[0] == "replica1.db"
+        assert db.query("select node from a")[0][0] == "replica2.db"
+        stream.close()
+
+
+def test_write_through_query_lands_on_the_primary(nodes):
+    with RDBMHandle(nodes[0], replicas=nodes[1:]) as db:
+        assert db.query("insert into a (node) values ('new') returning id") == [(2,)]
+        db.conn.commit()
+        # read your writes: the next read sticks to the primary
+        assert db.query("select count(*) from a") == [(2,)]
+        assert db.routing_stats()["decisions"] == {"replica": 0, "sticky": 1, "fallback": 0}
+    assert [count(config) for config in nodes] == [2, 1, 1]
+
+
+def test_read_only_commit_does_not_stick(nodes):
+    with RDBMHandle(nodes[0], replicas=nodes[1:]) as db:
+        db.conn.execute(text("select 1"))
+        db.conn.commit()
+        assert db.query("select node from a")[0][0] == "replica1.db"
+
+
+def test_broken_replica_is_ejected(nodes, tmp_path):
+    broken = DBConfigSQLite(str(tmp_path / "missing" / "replica.db"))
+    router = ReplicaRouter([broken, nodes[1]], max_failures=2, eject_seconds=60)
+    with RDBMHandle(nodes[0], replicas=router) as db:
+        for _ in range(4):
+            assert db.query("select node from a")[0][0] == "replica1.db"
+        stats = router.stats()
+        assert stats["replicas"][0]["ejected"] and stats["replicas"][0]["failures"] == 2
+        assert stats["decisions"] == {"replica": 4, "sticky": 0, "fallback": 0}
+        assert router.check_health() == {stats["replicas"][0]["name"]: False, stats["replicas"][1]["name"]: True}
+
+
+def test_fallback_to_the_primary_is_counted_once(nodes, tmp_path):
+    router = ReplicaRouter([DBConfigSQLite(str(tmp_path / "missing" / "replica.db"))], max_failures=1, eject_seconds=60)
+    with RDBMHandle(nodes[0], replicas=router) as db:
+        assert db.query("select node from a")[0][0] == "primary.db"
+        assert db.query("select node from a")[0][0] == "primary.db"
+        assert router.stats()["decisions"] == {"replica": 0, "sticky": 0, "fallback": 2}
+
+
+def test_is_read():
+    assert is_read("select * from a")
+    assert is_read("with x as (select 1) select * from x")
+    assert not is_read("with x as (delete from a returning id) select * from x")
+    assert not is_read("select * from a for update")
+    assert not is_read("insert into a values (1)")
@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from db_handler import DBConfigSQLite, RDBMHandle
+from unit_of_work import UnitOfWork
+
+
+class Writer:
+    """Batch writer failing the statements in fail, raising for the whole batch like a database would"""
+
+    def __init__(self, fail=(), broken=False):
+        self.fail = set(fail)
+        self.broken = broken
+        self.committed = []
+        self.calls = []
+        self.flushed = threading.Event()
+
+    def __call__(self, batch, isolate):
+        self.calls.append(isolate)
+        if self.broken:
+            raise ConnectionError("connection lost")
+        failed = [(index, ValueError(statement)) for index, (statement, _) in enumerate(batch) if statement in self.fail]
+        if failed and not isolate:
+            raise failed[0][1]
+        failed_indices = {index for index, _ in failed}
+        self.committed.extend(statement for index, (statement, _) in enumerate(batch) if index not in failed_indices)
+        self.flushed.set()
+        return failed
+
+
+def test_flush_on_size():
+    writer = Writer()
+    with UnitOfWork(writer, max_statements=2, max_delay=None) as uow:
+        assert uow.add("a") is None
+        assert uow.add("b").statements == 2
+        uow.add("c")
+    assert writer.committed == ["a", "b", "c"]
+    assert uow.stats()["commits"] == 2
+
+
+def test_replay_commits_the_rest_of_the_batch():
+    writer, failures = Writer(fail={"b"}), []
+    with UnitOfWork(writer, on_failure=failures.extend) as uow:
+        for statement in "abc":
+            uow.add(statement)
+    assert writer.calls == [False, True]
+    assert writer.committed == ["a", "c"]
+    assert [failure.statement for failure in failures] == ["b"]
+    assert uow.stats()["replays"] == 1
+
+
+def test_failed_replay_reports_the_whole_batch():
+    failures = []
+    uow = UnitOfWork(Writer(broken=True), on_failure=failures.extend)
+    uow.add("a")
+    uow.add("b")
+    result = uow.close()
+    assert [failure.statement for failure in result.failures] == ["a", "b"] == [f.statement for f in failures]
+    assert uow.stats()["commits"] == 0
+
+
+def test_background_flush_after_delay():
+    writer = Writer()
+    uow = UnitOfWork(writer, max_delay=0.01, background=True)
+    uow.add("a")
+    assert writer.flushed.wait(2)
+    uow.close()
+    assert writer.committed == ["a"]
+
+
+def test_sqlite_memory_keeps_the_callers_transaction():
+    with RDBMHandle(DBConfigSQLite(), shared_engine=False) as db:
+        db.conn.execute(text("create table t (id integer primary key)"))
+        db.conn.commit()
+        db.conn.execute(text("insert into t values (1)"))
+        with db.unit_of_work() as uow:
+            uow.add("insert into t values (2)")
+        db.conn.rollback()
+        assert db.conn.execute(text("select id from t")).all() == []
+        with pytest.raises(ValueError):
+            db.unit_of_work(background=True)
+
+
+def test_sqlite_file_batch(tmp_path):
+    failures = []
+    with RDBMHandle(DBConfigSQLite(str(tmp_path / "uow.db"))) as db:
+        db.conn.execute(text("create table t (id integer primary key)"))
+        db.conn.commit()
+        with db.unit_of_work(on_failure=failures.extend) as uow:
+            for id in (1, 2, 2, 3):
+                uow.add("insert into t values (:id)", {"id": id})
+        assert db.conn.execute(text("select id from t")).all() == [(1,), (2,), (3,)]
+    assert len(failures) == 1
+
+
+def test_psycopg2_background_needs_a_pool(pg_settings):
+    from handler import DatabaseHandler
+
+    handler = DatabaseHandler(**pg_settings)
+    try:
+        with pytest.raises(ValueError):
+            handler.unit_of_work(background=True)
+        handler.unit_of_work().close()
+    finally:
+        handler.close()
+
+    pooled = DatabaseHandler(**pg_settings, pool_max_size=2)
+    try:
+        pooled.unit_of_work(background=True).close()
+    finally:
+        pooled.close()
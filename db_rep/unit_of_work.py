@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StatementFailure(NamedTuple):
+    """A queued statement that failed, the other statements of its batch were committed unless they failed too"""
+
+    statement: Any
+    parameters: Any
+    error: Exception
+
+
+class FlushResult(NamedTuple):
+    statements: int
+    failures: list[StatementFailure]
+    seconds: float
+
+
+# writes statements in one transaction and commits. With isolate=False the first error rolls
+# everything back and is raised, with isolate=True every statement runs in its own savepoint and
+# the (index, error) pairs of the failed statements are returned.
+BatchWriter = Callable[[list[tuple[Any, Any]], bool], list[tuple[int, Exception]]]
+
+
+class UnitOfWork:
+    """Queue of writes committed together in one transaction (group commit)
+
+    The queue is flushed once it holds max_statements statements or its oldest statement waited
+    max_delay seconds, and on leaving the context. A batch is first written without savepoints.
+    Only if it fails, it is rolled back and replayed with one savepoint per statement, so a
+    failing statement is reported to on_failure while the rest of the batch is committed. If the
+    replay fails as well (e.g. the connection is lost), nothing was committed and every statement
+    of the batch is reported to on_failure with that error.
+
+    With background=True a timer thread flushes delayed batches, otherwise the delay is checked
+    whenever a statement is added. The handlers create it through unit_of_work():
+
+    >>> with handler.unit_of_work(max_statements=1000, max_delay=0.5) as uow:
+    >>>     for row in rows:
+    >>>         uow.add("INSERT INTO events VALUES (%s, %s)", row)
+
+    :param writer: backend function writing one batch
+    :param max_statements: size threshold of a batch
+    :param max_delay: seconds the oldest queued statement may wait, None for no time threshold
+    :param on_failure: called with the failures of every flush, failures are logged otherwise
+    :param background: flush delayed batches from a timer thread
+    """
+
+    LATENCY_WINDOW = 1000
+
+    def __init__(
+        self,
+        writer: BatchWriter,
+        max_statements: int = 500,
+        max_delay: Optional[float] = 1.0,
+        on_failure: Optional[Callable[[list[StatementFailure]], Any]] = None,
+        background: bool = False,
+    ):
+        self.writer = writer
+        self.max_statements = max_statements
+        self.max_delay = max_delay
+        self.on_failure = on_failure
+        self._queue: list[tuple[Any, Any]] = []
+        self._first_queued: Optional[float] = None
+        self._lock = threading.RLock()
+        self._closed = False
+        self._latencies: deque[float] = deque(maxlen=self.LATENCY_WINDOW)
+        self.commits = 0
+        self.statements = 0
+        self.failures = 0
+        self.replays = 0
+        self.max_batch = 0
+        self._timer: Optional[threading.Thread] = None
+        self._wakeup = threading.Condition(self._lock)
+        if background and max_delay is not None:
+            self._timer = threading.Thread(target=self._flush_delayed, name="unit-of-work", daemon=True)
+            self._timer.start()
+
+    def add(self, statement: Any, parameters: Any = None) -> Optional[FlushResult]:
+        """Queue a write, returns the flush result if the statement triggered a flush"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("unit of work is closed")
+            if not self._queue:
+                self._first_queued = time.monotonic()
+                self._wakeup.notify()
+            self._queue.append((statement, parameters))
+            if len(self._queue) >= self.max_statements or self._due():
+                return self.flush()
+        return None
+
+    def flush(self) -> FlushResult:
+        """Write the queued statements in one transaction"""
+        with self._lock:
+            batch, self._queue, self._first_queued = self._queue, [], None
+            if not batch:
+                return FlushResult(0, [], 0.0)
+
+            start, committed = time.perf_counter(), True
+            try:
+                errors = self.writer(batch, False)
+            except Exception as e:
+                logger.info(f"unit of work : batch of {len(batch)} failed ({e!r}), replaying with savepoints")
+                self.replays += 1
+                try:
+                    errors = self.writer(batch, True)
+                except Exception as e:
+                    logger.error(f"unit of work : replay of {len(batch)} statements failed, none committed - {e!r}")
+                    errors = [(index, e) for index in range(len(batch))]
+                    committed = False
+            seconds = time.perf_counter() - start
+
+            failures = [StatementFailure(*batch[index], error) for index, error in errors]
+            if committed:
+                self.commits += 1
+            self.statements += len(batch)
+            self.failures += len(failures)
+            self.max_batch = max(self.max_batch, len(batch))
+            self._latencies.append(seconds)
+
+        if failures:
+            if self.on_failure is not None:
+                self.on_failure(failures)
+            else:
+                for failure in failures:
+                    logger.warning(f"unit of work : statement failed - {failure.error!r} : {failure.statement}")
+        return FlushResult(len(batch), failures, seconds)
+
+    def stats(self) -> dict[str, Any]:
+        """Commit count, batch sizes and commit latency (percentiles over the last LATENCY_WINDOW commits)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            pending = len(self._queue)
+        return {
+            "commits": self.commits,
+            "statements": self.statements,
+            "failures": self.failures,
+            "replays": self.replays,
+            "pending": pending,
+            "mean_batch": self.statements / self.commits if self.commits else 0.0,
+            "max_batch": self.max_batch,
+            "commit_p50": _percentile(latencies, 0.5),
+            "commit_p99": _percentile(latencies, 0.99),
+            "commit_max": latencies[-1] if latencies else 0.0,
+        }
+
+    def close(self) -> FlushResult:
+        """Flush the remaining statements and stop the timer"""
+        with self._lock:
+            result = self.flush()
+            self._closed = True
+            self._wakeup.notify()
+        if self._timer is not None:
+            self._timer.join()
+        return result
+
+    def _due(self) -> bool:
+        return (
+            self.max_delay is not None
+            and self._first_queued is not None
+            and time.monotonic() - self._first_queued >= self.max_delay
+        )
+
+    def _flush_delayed(self):
+        with self._lock:
+            while not self._closed:
+                if self._first_queued is None:
+                    self._wakeup.wait()
+                    continue
+                remaining = self._first_queued + self.max_delay - time.monotonic()
+                if remaining > 0:
+                    self._wakeup.wait(remaining)
+                    continue
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"unit of work : background flush failed - {e!r}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
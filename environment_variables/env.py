@@ -1,8 +1,24 @@
 # cheers to Andrei Tchijov https://github.com/leapingbytes
 
+import hashlib
+import json
+import logging
 import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
 from enum import Enum
-from typing import Optional
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # python < 3.11, toml files need tomli then
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+logger = logging.getLogger(__name__)
 
 
 class ExtendedEnum(Enum):
@@ -38,15 +54,103 @@ CONFIGURATION = {
     }
 }
 
+# values of the config files, layered between the environment and CONFIGURATION. A ConfigWatcher replaces
+# the whole dictionary, it is never changed in place
+FILE_CONFIGURATION: Dict[Stacks, Dict[Vars, str]] = {}
+
 ASSIGNED_STACK: Optional[Stacks] = None
 
+# overrides ASSIGNED_STACK in the current thread or asyncio task (and in the tasks it creates) only
+STACK_OVERRIDE: ContextVar[Optional[Stacks]] = ContextVar('STACK_OVERRIDE', default=None)
+
+
+class ConfigSnapshot:
+    """The values of all Vars for one stack, resolved once
+
+    Read the values as attributes, snapshot.TEST1, or by variable, snapshot[Vars.TEST1].
+    STACK holds the stack the snapshot was resolved for. The snapshot is immutable.
+    """
+    __slots__ = tuple(Vars.__members__)
+
+    def __init__(self, values: Dict[Vars, str]):
+        for var, value in values.items():
+            object.__setattr__(self, var.name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, var: Vars) -> str:
+        return getattr(self, var.name)
+
+    def as_dict(self) -> Dict[Vars, str]:
+        return {var: getattr(self, var.name) for var in Vars}
+
+    def __repr__(self):
+        values = ', '.join(f'{var.name}={getattr(self, var.name)!r}' for var in Vars)
+        return f'{type(self).__name__}({values})'
+
+
+# snapshots by assigned stack, None is the stack of the environment
+SNAPSHOTS: Dict[Optional[Stacks], ConfigSnapshot] = {}
+
 
 def assign_stack(stack: Optional[Stacks]):
+    """Assign the stack of the process, its snapshot is resolved again"""
     global ASSIGNED_STACK
+    SNAPSHOTS.pop(stack, None)
     ASSIGNED_STACK = stack
 
 
+def override_stack(stack: Optional[Stacks]) -> Token:
+    """Use another stack in the current thread or asyncio task, concurrent ones keep theirs
+
+    Returns a token to restore the previous override with STACK_OVERRIDE.reset(token).
+    """
+    return STACK_OVERRIDE.set(stack)
+
+
+@contextmanager
+def use_stack(stack: Optional[Stacks]) -> Iterator[ConfigSnapshot]:
+    """Override the stack inside the with block only"""
+    token = override_stack(stack)
+    try:
+        yield load_snapshot()
+    finally:
+        STACK_OVERRIDE.reset(token)
+
+
+def load_snapshot(reload: bool = False) -> ConfigSnapshot:
+    """The resolved configuration of the current stack
+
+    Resolving happens on first use, after assign_stack and with reload=True (e.g. after changes of
+    os.environ), otherwise this is a dictionary lookup.
+    """
+    global SNAPSHOTS
+    stack = STACK_OVERRIDE.get()
+    if stack is None:
+        stack = ASSIGNED_STACK
+    if reload:
+        SNAPSHOTS = {}
+    snapshots = SNAPSHOTS
+    snapshot = snapshots.get(stack)
+    if snapshot is None:
+        # stored in the dictionary it was looked up in, a snapshot resolved during a reload is discarded with it
+        snapshot = snapshots[stack] = resolve_snapshot(stack if stack is not None else get_stack())
+    return snapshot
+
+
+def resolve_snapshot(stack: Stacks) -> ConfigSnapshot:
+    values = {var: get_config_for_stack(stack, var) for var in Vars if var is not Vars.STACK}
+    return ConfigSnapshot({Vars.STACK: stack, **values})
+
+
 def get_stack() -> Stacks:
+    stack = STACK_OVERRIDE.get()
+    if stack is not None:
+        return stack
     if ASSIGNED_STACK is not None:
         return ASSIGNED_STACK
     if Vars.STACK.value not in os.environ:
@@ -62,9 +166,162 @@ def get_config(var) -> str:
 
 def get_config_for_stack(stack, var) -> str:
     if var.value not in os.environ:
+        files = FILE_CONFIGURATION.get(stack)
+        if files is not None and var in files:
+            return files[var]
         if var not in CONFIGURATION[stack]:
             raise Exception(f"Invalid configuration: missing environment variable '{var}'")
         else:
             return CONFIGURATION[stack][var]
     else:
         return os.environ[var.value]
+
+
+def load_config_file(path: str) -> Dict[Stacks, Dict[Vars, str]]:
+    """Read a JSON or TOML (.toml) file with a table of variables per stack
+
+    {"dev": {"TEST1": "value"}, "prod": {"TEST1": "value", "TEST2": "value"}}
+
+    Unknown stacks and variables raise a ValueError, values that are no strings are converted with str().
+    """
+    with open(path, 'rb') as file:
+        return parse_config(file.read(), path)
+
+
+def parse_config(content: bytes, path: str) -> Dict[Stacks, Dict[Vars, str]]:
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise ImportError(f"reading {path} needs python >= 3.11 or tomli")
+        data = tomllib.loads(content.decode())
+    else:
+        data = json.loads(content)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a table of stacks, got {type(data).__name__}")
+
+    configuration = {}
+    for stack_name, values in data.items():
+        if stack_name not in Stacks.list():
+            raise ValueError(f"{path}: unknown stack '{stack_name}'")
+        if not isinstance(values, dict):
+            raise ValueError(f"{path}: expected a table of variables for stack '{stack_name}'")
+        unknown = set(values) - set(Vars.list())
+        if unknown:
+            raise ValueError(f"{path}: unknown variables {sorted(unknown)} for stack '{stack_name}'")
+        configuration[Stacks(stack_name)] = {Vars(name): str(value) for name, value in values.items()}
+    return configuration
+
+
+class ConfigWatcher:
+    """Loads config files into FILE_CONFIGURATION and reloads them when they change
+
+    Later files override earlier ones, environment variables override all files. check() compares
+    the stat of every file (modification time, size, inode) with the last load, only a changed stat
+    reads the file, and only changed content (sha256) parses it. The new values replace
+    FILE_CONFIGURATION at once, then the snapshots are resolved again and the subscribers get the
+    set of Vars whose value changed in any stack. A file that is missing or does not parse is logged
+    and its last values are kept.
+
+    start() checks every interval seconds in a daemon thread. Use one watcher per process:
+
+    >>> watcher = ConfigWatcher('config.json', 'local.toml').start()
+    >>> watcher.subscribe(lambda changed: print(f'changed: {changed}'))
+
+    :param paths: JSON or TOML (.toml) files as described in load_config_file
+    :param interval: seconds between two checks of the background thread
+    """
+
+    def __init__(self, *paths: str, interval: float = 5.0):
+        self.paths = list(paths)
+        self.interval = interval
+        self.reloads = 0
+        self._stats: Dict[str, Optional[Tuple[int, int, int]]] = {path: None for path in self.paths}
+        self._hashes: Dict[str, Optional[str]] = {path: None for path in self.paths}
+        self._contents: Dict[str, Dict[Stacks, Dict[Vars, str]]] = {path: {} for path in self.paths}
+        self._subscribers: List[Callable[[FrozenSet[Vars]], Any]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, callback: Callable[[FrozenSet[Vars]], Any]) -> Callable[[FrozenSet[Vars]], Any]:
+        """Call callback with the changed Vars after every reload, usable as decorator"""
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback: Callable[[FrozenSet[Vars]], Any]):
+        self._subscribers.remove(callback)
+
+    def check(self) -> FrozenSet[Vars]:
+        """Reload the files if one of them changed, returns the changed Vars"""
+        with self._lock:
+            if not any([self._read(path) for path in self.paths]):
+                return frozenset()
+            changed = self._swap()
+        if changed:
+            for callback in list(self._subscribers):
+                try:
+                    callback(changed)
+                except Exception:
+                    logger.exception('config subscriber %r failed', callback)
+        return changed
+
+    def _read(self, path: str) -> bool:
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            if signature == self._stats[path]:
+                return False
+            with open(path, 'rb') as file:
+                content = file.read()
+            self._stats[path] = signature
+            digest = hashlib.sha256(content).hexdigest()
+            if digest == self._hashes[path]:
+                return False
+            self._contents[path] = parse_config(content, path)
+            self._hashes[path] = digest
+            return True
+        except (OSError, ValueError) as e:
+            logger.warning('config file %s not loaded, keeping its last values : %s', path, e)
+            return False
+
+    def _swap(self) -> FrozenSet[Vars]:
+        global FILE_CONFIGURATION, SNAPSHOTS
+        configuration: Dict[Stacks, Dict[Vars, str]] = {}
+        for path in self.paths:
+            for stack, values in self._contents[path].items():
+                configuration.setdefault(stack, {}).update(values)
+
+        previous = FILE_CONFIGURATION
+        changed = frozenset(
+            var for stack in Stacks for var in Vars
+            if previous.get(stack, {}).get(var) != configuration.get(stack, {}).get(var)
+        )
+        FILE_CONFIGURATION = configuration
+        SNAPSHOTS = {}
+        self.reloads += 1
+        logger.info('config reloaded from %s, changed %s', self.paths, sorted(var.name for var in changed))
+        return changed
+
+    def start(self) -> 'ConfigWatcher':
+        """Load the files now and check them every interval seconds in a daemon thread"""
+        self.check()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='config-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def __enter__(self) -> 'ConfigWatcher':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
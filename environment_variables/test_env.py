@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+import env
+from env import ConfigWatcher, Stacks, Vars, assign_stack, get_config, get_stack, load_snapshot, override_stack, \
+    use_stack
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    monkeypatch.delenv(Vars.STACK.value, raising=False)
+    monkeypatch.delenv(Vars.TEST1.value, raising=False)
+    monkeypatch.setattr(env, "ASSIGNED_STACK", None)
+    monkeypatch.setattr(env, "SNAPSHOTS", {})
+    monkeypatch.setattr(env, "FILE_CONFIGURATION", {})
+
+
+def test_snapshot_matches_get_config():
+    snapshot = load_snapshot()
+    assert snapshot.STACK is Stacks.DEV
+    assert snapshot.TEST1 == snapshot[Vars.TEST1] == get_config(Vars.TEST1)
+    assert load_snapshot() is snapshot
+    with pytest.raises(AttributeError):
+        snapshot.TEST1 = "changed"
+
+
+def test_snapshot_is_resolved_again_on_assign_and_reload(monkeypatch):
+    dev = load_snapshot()
+    monkeypatch.setenv(Vars.TEST1.value, "from environment")
+    assert load_snapshot() is dev
+    assert load_snapshot(reload=True).TEST1 == "from environment"
+    monkeypatch.delenv(Vars.TEST1.value)
+    assign_stack(Stacks.PROD)
+    assert load_snapshot().TEST1 == env.CONFIGURATION[Stacks.PROD][Vars.TEST1]
+
+
+def test_assigned_stack_is_process_wide():
+    assign_stack(Stacks.PROD)
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append((get_stack(), load_snapshot().STACK)))
+    thread.start()
+    thread.join()
+    assert seen == [(Stacks.PROD, Stacks.PROD)]
+
+
+def test_override_is_per_task():
+    assign_stack(Stacks.PROD)
+
+    async def task(stack):
+        override_stack(stack)
+        await asyncio.sleep(0.01)
+        return get_stack(), load_snapshot().STACK
+
+    async def main():
+        return await asyncio.gather(task(Stacks.DEV), task(Stacks.TEST))
+
+    assert asyncio.run(main()) == [(Stacks.DEV, Stacks.DEV), (Stacks.TEST, Stacks.TEST)]
+    assert get_stack() is Stacks.PROD
+    with use_stack(Stacks.TEST) as snapshot:
+        assert snapshot.STACK is get_stack() is Stacks.TEST
+    assert get_stack() is Stacks.PROD
+
+
+def write(path, content):
+    path.write_text(json.dumps(content) if path.suffix == ".json" else content)
+
+
+def test_watcher_layers_files_under_the_environment(tmp_path, monkeypatch):
+    base, local = tmp_path / "config.json", tmp_path / "local.toml"
+    write(base, {"dev": {"TEST1": "base", "TEST2": "base"}})
+    write(local, '[dev]\nTEST2 = "local"\n')
+    watcher = ConfigWatcher(str(base), str(local))
+    assert watcher.check() == {Vars.TEST1, Vars.TEST2}
+    assert (load_snapshot().TEST1, load_snapshot().TEST2) == ("base", "local")
+    assert env.get_config_for_stack(Stacks.PROD, Vars.TEST1) == env.CONFIGURATION[Stacks.PROD][Vars.TEST1]
+    monkeypatch.setenv(Vars.TEST1.value, "environment")
+    assert get_config(Vars.TEST1) == "environment"
+
+
+def test_watcher_reloads_changes_only(tmp_path):
+    path = tmp_path / "config.json"
+    write(path, {"dev": {"TEST1": "one"}})
+    watcher, changes = ConfigWatcher(str(path)), []
+    watcher.subscribe(changes.append)
+    watcher.check()
+    snapshot = load_snapshot()
+
+    assert watcher.check() == frozenset()
+    path.touch()
+    assert watcher.check() == frozenset()
+    assert watcher.reloads == 1 and load_snapshot() is snapshot
+
+    write(path, {"dev": {"TEST1": "two"}})
+    assert watcher.check() == {Vars.TEST1}
+    assert load_snapshot().TEST1 == "two"
+    assert changes == [{Vars.TEST1}, {Vars.TEST1}]
+
+
+def test_watcher_keeps_values_of_broken_files(tmp_path):
+    path = tmp_path / "config.json"
+    write(path, {"dev": {"TEST1": "one"}})
+    watcher = ConfigWatcher(str(path))
+    watcher.check()
+    path.write_text("{broken")
+    assert watcher.check() == frozenset()
+    write(path, {"qa": {}})
+    assert watcher.check() == frozenset()
+    assert get_config(Vars.TEST1) == "one"
+
+
+def test_watcher_thread(tmp_path):
+    path = tmp_path / "config.json"
+    write(path, {"dev": {"TEST1": "one"}})
+    changed = threading.Event()
+    with ConfigWatcher(str(path), interval=0.01) as watcher:
+        watcher.subscribe(lambda variables: changed.set())
+        write(path, {"dev": {"TEST1": "two", "TEST2": "two"}})
+        assert changed.wait(2)
+    assert load_snapshot().TEST2 == "two"
@@ -0,0 +1,54 @@
+import json
+import logging
+import os
+import tempfile
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, select
+
+from ingest import ingest
+from db_handler import DBConfigSQLite, RDBMHandle
+from validator import is_defined_string, is_optional_date_in_past, is_optional_email, is_optional_not_empty_string
+
+logging.basicConfig(level=logging.ERROR)  # no warning per sanitized record
+
+
+class CustomerTables:
+    meta = MetaData()
+    customer = Table(
+        'customer', meta,
+        Column('id', Integer, primary_key=True),
+        Column('username', String, nullable=False, unique=True),
+        Column('email', String),
+        Column('firstname', String),
+        Column('birthday', String),
+    )
+
+
+CUSTOMER_RULES = {
+    'username': [is_defined_string()],
+    'email': [is_optional_email()],
+    'firstname': [is_optional_not_empty_string()],
+    'birthday': [is_optional_date_in_past('%Y-%m-%d')],
+}
+
+directory = tempfile.mkdtemp()
+source = os.path.join(directory, 'customers.jsonl')
+dead_letter = os.path.join(directory, 'dead_letter.jsonl')
+
+with open(source, 'w') as file:
+    for index in range(10000):
+        file.write(json.dumps({'username': f'user{index}', 'email': f'user{index}@test.de',
+                               'firstname': 'Nick', 'birthday': '1994-01-01', 'unused': 1}) + '\n')
+    file.write(json.dumps({'username': 'user1', 'email': 'duplicate@test.de'}) + '\n')  # refused: username unique
+    file.write(json.dumps({'username': 'user-x', 'email': 'testtest.de'}) + '\n')  # sanitized: email dropped
+    file.write('{"username": "broken\n')  # not JSON
+
+with RDBMHandle(DBConfigSQLite(), tables=CustomerTables) as db:
+    CustomerTables.meta.create_all(db.conn)
+    stats = ingest(source, CUSTOMER_RULES, db, 'customer', dead_letter=dead_letter, batch_size=2000)
+    print(stats)
+    print(db.conn.execute(select(func.count()).select_from(CustomerTables.customer)).scalar())
+
+with open(dead_letter) as file:
+    for line in file:
+        print(line.strip())
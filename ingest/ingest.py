@@ -0,0 +1,306 @@
+import argparse
+import importlib
+import io
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple, Union
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for module_dir in ('validator', 'db_rep'):
+    path = os.path.join(ROOT, module_dir)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from sqlalchemy import Table  # noqa: E402
+from sqlalchemy.exc import DataError, IntegrityError  # noqa: E402
+from db_handler import DBConfigSQLite, RDBMHandle  # noqa: E402
+from stream import read_chunks  # noqa: E402
+from validator import CompiledSchema, compile_schema  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+Source = Union[str, IO, Iterable[Union[dict, str, bytes]]]
+DeadLetter = Optional[Union[str, IO, Callable[[Dict[str, Any]], Any]]]
+
+_DONE = object()
+
+
+class IngestStats:
+    """Counters and busy time per stage, the rates are records per busy second of the stage
+
+    blocked is the time the validation waited for a free queue slot (the writer is the bottleneck),
+    idle the time the writer waited for a batch (the validation is the bottleneck).
+    """
+    __slots__ = ('read', 'valid', 'sanitized', 'rejected', 'written', 'failed', 'batches',
+                 'validate_seconds', 'write_seconds', 'blocked', 'idle', 'started', 'finished')
+
+    def __init__(self):
+        self.read = 0
+        self.valid = 0
+        self.sanitized = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.validate_seconds = 0.0
+        self.write_seconds = 0.0
+        self.blocked = 0.0
+        self.idle = 0.0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def dead_letters(self) -> int:
+        return self.rejected + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished if self.finished is not None else time.perf_counter()) - self.started
+
+    @property
+    def records_per_second(self) -> float:
+        return self.read / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def validate_per_second(self) -> float:
+        return self.read / self.validate_seconds if self.validate_seconds > 0 else 0.0
+
+    @property
+    def write_per_second(self) -> float:
+        return (self.written + self.failed) / self.write_seconds if self.write_seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        result = {name: getattr(self, name) for name in self.__slots__ if name not in ('started', 'finished')}
+        result.update(dead_letters=self.dead_letters, elapsed=self.elapsed,
+                      records_per_second=self.records_per_second, validate_per_second=self.validate_per_second,
+                      write_per_second=self.write_per_second)
+        return result
+
+    def __repr__(self):
+        return (f'{type(self).__name__}(read={self.read}, written={self.written}, dead_letters={self.dead_letters}, '
+                f'elapsed={self.elapsed:.3f}s, records_per_second={self.records_per_second:.0f}, '
+                f'validate_per_second={self.validate_per_second:.0f}, write_per_second={self.write_per_second:.0f}, '
+                f'blocked={self.blocked:.3f}s, idle={self.idle:.3f}s)')
+
+
+def ingest(source: Source, rules: Union[Dict, CompiledSchema], handle: RDBMHandle, table: Union[str, Table],
+           dead_letter: DeadLetter = None, batch_size: int = 1000, queue_size: int = 4,
+           reject_invalid: bool = False) -> IngestStats:
+    """Stream records from source through the rules into batched inserts of table
+
+    Reading and validation run in a background thread, the inserts in the calling thread on
+    handle.conn. Both are connected by a queue of at most queue_size batches, a full queue
+    blocks the validation until the database caught up.
+
+    Records with invalid keys are sanitized (the keys are dropped) and inserted, with
+    reject_invalid=True they go to the dead letters instead. Lines that are not JSON objects and
+    rows the database refuses (integrity and data errors) are dead letters as well. A refused batch
+    is rolled back and replayed row by row in savepoints, so only the failing rows are lost. Other
+    database errors (e.g. a missing table) end the ingest with the exception.
+
+    :param source: JSONL path, binary or text file, or an iterable of dicts or JSON lines
+    :param rules: rules dictionary or compiled schema, its top level keys pick the inserted columns
+    :param handle: connected RDBMHandle, batches are committed on handle.conn
+    :param table: SQLAlchemy table or its name in handle.tables.meta
+    :param dead_letter: JSONL path, open file or callable receiving the rejected records
+    :param batch_size: records per validation chunk and per insert
+    :param queue_size: validated batches that may wait for the writer
+    :param reject_invalid: send records with invalid keys to the dead letters instead of sanitizing them
+    """
+    schema = rules if isinstance(rules, CompiledSchema) else compile_schema(rules)
+    if isinstance(table, str):
+        table = handle.tables.meta.tables[table]
+    columns = [column.name for column in table.columns if column.name in schema.rules]
+    statement = table.insert()
+
+    stats = IngestStats()
+    batches: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    rejects, close_rejects = _dead_letter_sink(dead_letter)
+
+    producer = threading.Thread(
+        target=_validate_stage, name='ingest-validate',
+        args=(source, schema, columns, batch_size, reject_invalid, batches, rejects, stats, stop),
+    )
+    producer.start()
+    try:
+        while True:
+            waited = time.perf_counter()
+            batch = batches.get()
+            stats.idle += time.perf_counter() - waited
+            if batch is _DONE:
+                break
+            if isinstance(batch, BaseException):
+                raise batch
+            started = time.perf_counter()
+            _write_batch(handle, statement, batch, rejects, stats)
+            stats.write_seconds += time.perf_counter() - started
+    finally:
+        stop.set()
+        producer.join()
+        close_rejects()
+        stats.finished = time.perf_counter()
+
+    logger.info('ingest : %s', stats)
+    return stats
+
+
+def _validate_stage(source: Source, schema: CompiledSchema, columns: List[str], batch_size: int,
+                    reject_invalid: bool, batches: queue.Queue, rejects: Callable, stats: IngestStats,
+                    stop: threading.Event):
+    try:
+        for chunk in _read(source, batch_size):
+            started = time.perf_counter()
+            positions, records = [], []
+            for position, item in chunk:
+                record = item
+                if not isinstance(item, dict):
+                    try:
+                        record = json.loads(item)
+                    except ValueError as e:
+                        record = e
+                    if not isinstance(record, dict):
+                        error = (f'invalid JSON - {record}' if isinstance(record, ValueError)
+                                 else f'expected JSON object, got {type(record).__name__}')
+                        rejects({'line': position, 'stage': 'parse', 'error': error, 'raw': _text(item)})
+                        continue
+                positions.append(position)
+                records.append(record)
+
+            stats.read += len(chunk)
+            stats.rejected += len(chunk) - len(records)
+            result = schema.validate_many(records)
+            batch = []
+            for index, record in enumerate(records):
+                errors = result.errors.get(index)
+                if errors is None:
+                    stats.valid += 1
+                elif reject_invalid:
+                    stats.rejected += 1
+                    rejects({'line': positions[index], 'stage': 'validate', 'error': result[index], 'record': record})
+                    continue
+                else:
+                    stats.sanitized += 1
+                    record = schema.strip(record, errors)
+                batch.append((positions[index], {column: record.get(column) for column in columns}))
+            stats.validate_seconds += time.perf_counter() - started
+
+            if batch and not _put(batches, batch, stop, stats):
+                return
+        _put(batches, _DONE, stop, stats)
+    except BaseException as e:
+        _put(batches, e, stop, stats)
+
+
+def _put(batches: queue.Queue, item: Any, stop: threading.Event, stats: IngestStats) -> bool:
+    waited = time.perf_counter()
+    try:
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    finally:
+        stats.blocked += time.perf_counter() - waited
+
+
+def _write_batch(handle: RDBMHandle, statement: Any, batch: List[Tuple[int, Dict[str, Any]]],
+                 rejects: Callable, stats: IngestStats):
+    conn = handle.conn
+    try:
+        conn.execute(statement, [row for _, row in batch])
+        conn.commit()
+        stats.written += len(batch)
+    except (IntegrityError, DataError):
+        conn.rollback()
+        for position, row in batch:
+            try:
+                with conn.begin_nested():
+                    conn.execute(statement, row)
+                stats.written += 1
+            except (IntegrityError, DataError) as e:
+                stats.failed += 1
+                rejects({'line': position, 'stage': 'write', 'error': str(e.orig), 'record': row})
+        conn.commit()
+    stats.batches += 1
+
+
+def _read(source: Source, batch_size: int) -> Iterator[List[Tuple[int, Any]]]:
+    if isinstance(source, (str, io.IOBase)):
+        yield from read_chunks(source, batch_size)
+        return
+    items = enumerate(source, start=1)
+    while True:
+        chunk = list(islice(items, batch_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _text(item: Any) -> Any:
+    if isinstance(item, bytes):
+        return item.decode(errors='replace').rstrip('\r\n')
+    return item.rstrip('\r\n') if isinstance(item, str) else item
+
+
+def _dead_letter_sink(target: DeadLetter) -> Tuple[Callable[[Dict[str, Any]], Any], Callable[[], Any]]:
+    if target is None:
+        return (lambda rejection: None), (lambda: None)
+    if callable(target):
+        return target, (lambda: None)
+    file = open(target, 'w') if isinstance(target, str) else target
+    lock = threading.Lock()
+    binary = not isinstance(file, io.TextIOBase)
+
+    def write(rejection: Dict[str, Any]):
+        line = json.dumps(rejection, default=str) + '\n'
+        with lock:
+            file.write(line.encode() if binary else line)
+
+    return write, (file.close if isinstance(target, str) else file.flush)
+
+
+def _load_attribute(reference: str) -> Any:
+    module_name, _, attribute = reference.partition(':')
+    if not attribute:
+        raise argparse.ArgumentTypeError(f'expected module:ATTRIBUTE, got {reference}')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Load a JSONL file through the validator into a database table.')
+    parser.add_argument('rules', type=_load_attribute, help='rules dictionary as module:ATTRIBUTE')
+    parser.add_argument('tables', type=_load_attribute, help='SQLTables object as module:ATTRIBUTE')
+    parser.add_argument('table', help='name of the table in the metadata of the tables')
+    parser.add_argument('input', help='JSONL file, - for stdin')
+    parser.add_argument('--sqlite', default=':memory:', help='sqlite database file, the tables are created if missing')
+    parser.add_argument('--dead-letter', help='JSONL output for rejected records')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--queue-size', type=int, default=4)
+    parser.add_argument('--reject-invalid', action='store_true', help='reject records with invalid keys')
+    args = parser.parse_args(argv)
+
+    with RDBMHandle(DBConfigSQLite(args.sqlite), tables=args.tables) as handle:
+        args.tables.meta.create_all(handle.conn)
+        handle.conn.commit()
+        source = sys.stdin.buffer if args.input == '-' else args.input
+        stats = ingest(source, args.rules, handle, args.table, args.dead_letter, args.batch_size,
+                       args.queue_size, args.reject_invalid)
+
+    print(f'{stats.read} records in {stats.elapsed:.3f}s ({stats.records_per_second:.0f} records/s): '
+          f'{stats.written} written, {stats.dead_letters} dead letters | validate {stats.validate_per_second:.0f}/s, '
+          f'write {stats.write_per_second:.0f}/s, validation blocked {stats.blocked:.2f}s, writer idle {stats.idle:.2f}s',
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
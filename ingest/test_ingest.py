@@ -0,0 +1,85 @@
+import io
+import json
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, select
+from sqlalchemy.exc import OperationalError
+
+from ingest import ingest
+from db_handler import DBConfigSQLite, RDBMHandle
+from validator import is_defined_string, is_optional_email
+
+
+class Tables:
+    meta = MetaData()
+    customer = Table(
+        'customer', meta,
+        Column('id', Integer, primary_key=True),
+        Column('username', String, nullable=False, unique=True),
+        Column('email', String),
+    )
+
+
+RULES = {
+    'username': [is_defined_string()],
+    'email': [is_optional_email()],
+}
+
+
+@pytest.fixture
+def handle():
+    with RDBMHandle(DBConfigSQLite(), tables=Tables, shared_engine=False) as db:
+        Tables.meta.create_all(db.conn)
+        db.conn.commit()
+        yield db
+
+
+def rows(handle):
+    return handle.conn.execute(select(Tables.customer.c.username, Tables.customer.c.email)
+                               .order_by(Tables.customer.c.id)).all()
+
+
+def test_dead_letters_of_every_stage(handle):
+    source = [
+        {'username': 'a', 'email': 'a@test.de'},
+        '{"username": "broken',
+        '[1, 2]',
+        {'username': 'a', 'email': 'duplicate@test.de'},
+        {'username': 'b', 'email': 'no-mail'},
+    ]
+    rejected = []
+    stats = ingest(source, RULES, handle, 'customer', dead_letter=rejected.append, batch_size=2)
+
+    assert rows(handle) == [('a', 'a@test.de'), ('b', None)]  # invalid email is sanitized
+    assert (stats.read, stats.written, stats.sanitized, stats.rejected, stats.failed) == (5, 2, 1, 2, 1)
+    assert [(rejection['line'], rejection['stage']) for rejection in rejected] == [
+        (2, 'parse'), (3, 'parse'), (4, 'write')]
+
+
+def test_reject_invalid_and_file_source(handle, tmp_path):
+    source = tmp_path / 'customers.jsonl'
+    source.write_text('\n'.join(json.dumps(record) for record in [
+        {'username': 'a', 'email': 'a@test.de', 'unused': 1},
+        {'username': 'b', 'email': 'no-mail'},
+    ]) + '\n')
+    dead_letter = io.StringIO()
+    stats = ingest(str(source), RULES, handle, Tables.customer, dead_letter=dead_letter, reject_invalid=True)
+
+    assert rows(handle) == [('a', 'a@test.de')]
+    assert stats.dead_letters == 1
+    rejection = json.loads(dead_letter.getvalue())
+    assert (rejection['line'], rejection['stage'], rejection['record']['username']) == (2, 'validate', 'b')
+
+
+def test_refused_batch_keeps_the_other_rows(handle):
+    source = [{'username': name} for name in ['a', 'b', 'a', 'c']]
+    stats = ingest(source, RULES, handle, 'customer', batch_size=4)
+
+    assert [username for username, _ in rows(handle)] == ['a', 'b', 'c']
+    assert (stats.written, stats.failed, stats.batches) == (3, 1, 1)
+
+
+def test_missing_table_ends_the_ingest():
+    with RDBMHandle(DBConfigSQLite(), tables=Tables, shared_engine=False) as db:  # tables not created
+        with pytest.raises(OperationalError):
+            ingest([{'username': 'a'}], RULES, db, 'customer')
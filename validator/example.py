@@ -3,7 +3,7 @@ from enum import Enum
 from typing import List, TypedDict, Optional, Dict
 
 from validator import is_optional_enum, is_optional_datetime, is_optional_not_empty_string, \
-    is_optional_email, is_defined_string, is_optional_bool, is_optional_date_in_past, sanitize, validate_and_raise, validate
+    is_optional_email, is_defined_string, is_optional_bool, is_optional_date_in_past, sanitize, validate_and_raise, validate, compile_schema
 
 
 class ExampleCustomer(TypedDict):
@@ -64,6 +64,10 @@ print(sanitize(example_customer_invalid, CUSTOMER_SANITIZER))
 print(validate(example_customer_valid, CUSTOMER_SANITIZER))
 print(validate(example_customer_invalid, CUSTOMER_SANITIZER))
 
+customer_schema = compile_schema(CUSTOMER_SANITIZER)
+print(customer_schema.validate(example_customer_valid))
+print(customer_schema.sanitize(example_customer_invalid))
+
 print(validate_and_raise(example_customer_valid, CUSTOMER_SANITIZER))
 print(validate_and_raise(example_customer_invalid, CUSTOMER_SANITIZER))
 
@@ -0,0 +1,165 @@
+import argparse
+import importlib
+import io
+import json
+import logging
+import sys
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from validator import compile_schema
+
+logger = logging.getLogger(__name__)
+
+VALID = 'valid'
+SANITIZED = 'sanitized'
+REJECTED = 'rejected'
+
+
+class StreamRecord(NamedTuple):
+    status: str
+    line_number: int
+    record: Any
+
+
+class StreamStats:
+    __slots__ = ('valid', 'sanitized', 'rejected', 'started', 'finished')
+
+    def __init__(self):
+        self.valid = 0
+        self.sanitized = 0
+        self.rejected = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def records(self) -> int:
+        return self.valid + self.sanitized + self.rejected
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished if self.finished is not None else time.perf_counter()) - self.started
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (f'{type(self).__name__}(records={self.records}, valid={self.valid}, sanitized={self.sanitized}, '
+                f'rejected={self.rejected}, elapsed={self.elapsed:.3f}s, '
+                f'records_per_second={self.records_per_second:.0f})')
+
+
+def read_chunks(source: Union[str, IO], chunk_size: int = 1000) -> Iterator[List[Tuple[int, Any]]]:
+    if isinstance(source, str):
+        with open(source, 'rb') as stream:
+            yield from read_chunks(stream, chunk_size)
+        return
+
+    line_number = 0
+    while True:
+        lines = list(islice(source, chunk_size))
+        if not lines:
+            return
+        chunk = []
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                chunk.append((line_number, line))
+        yield chunk
+
+
+def iter_jsonl(source: Union[str, IO], rules: Dict[str, List[Callable[[any], bool]]],
+               chunk_size: int = 1000) -> Iterator[StreamRecord]:
+    schema = compile_schema(rules)
+
+    for chunk in read_chunks(source, chunk_size):
+        line_numbers, records = [], []
+        for line_number, line in chunk:
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield StreamRecord(REJECTED, line_number, _rejection(line_number, f'invalid JSON - {e}', line))
+                continue
+            if not isinstance(record, dict):
+                yield StreamRecord(REJECTED, line_number,
+                                   _rejection(line_number, f'expected JSON object, got {type(record).__name__}', line))
+                continue
+            line_numbers.append(line_number)
+            records.append(record)
+
+        result = schema.validate_many(records)
+        for index, record in enumerate(records):
+            errors = result.errors.get(index)
+            if errors is None:
+                yield StreamRecord(VALID, line_numbers[index], schema.strip(record))
+            else:
+                yield StreamRecord(SANITIZED, line_numbers[index], schema.strip(record, errors))
+
+
+def process_jsonl(source: Union[str, IO], rules: Dict[str, List[Callable[[any], bool]]],
+                  valid: Optional[Union[Callable, IO]] = None,
+                  sanitized: Optional[Union[Callable, IO]] = None,
+                  rejected: Optional[Union[Callable, IO]] = None,
+                  chunk_size: int = 1000) -> StreamStats:
+    stats = StreamStats()
+    sinks = {VALID: _sink(valid), SANITIZED: _sink(sanitized), REJECTED: _sink(rejected)}
+
+    for status, _, record in iter_jsonl(source, rules, chunk_size):
+        setattr(stats, status, getattr(stats, status) + 1)
+        sink = sinks[status]
+        if sink is not None:
+            sink(record)
+
+    stats.finished = time.perf_counter()
+    logger.info('process_jsonl : %s', stats)
+    return stats
+
+
+def _sink(target: Optional[Union[Callable, IO]]) -> Optional[Callable[[Any], Any]]:
+    if target is None or callable(target):
+        return target
+    if isinstance(target, io.TextIOBase):
+        return lambda record: target.write(json.dumps(record) + '\n')
+    return lambda record: target.write(json.dumps(record).encode() + b'\n')
+
+
+def _rejection(line_number: int, error: str, line: Any) -> Dict[str, Any]:
+    if isinstance(line, bytes):
+        line = line.decode(errors='replace')
+    return {'line': line_number, 'error': error, 'raw': line.rstrip('\r\n')}
+
+
+def _load_rules(reference: str) -> Dict:
+    module_name, _, attribute = reference.partition(':')
+    if not attribute:
+        raise argparse.ArgumentTypeError(f'rules have to be given as module:ATTRIBUTE, got {reference}')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Validate and sanitize a JSONL file record by record.')
+    parser.add_argument('rules', type=_load_rules, help='rules dictionary as module:ATTRIBUTE')
+    parser.add_argument('input', help='JSONL file, - for stdin')
+    parser.add_argument('--valid', help='JSONL output for valid records')
+    parser.add_argument('--sanitized', help='JSONL output for sanitized records')
+    parser.add_argument('--rejected', help='JSONL output for rejected lines')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    outputs = {name: open(getattr(args, name), 'w') for name in (VALID, SANITIZED, REJECTED) if getattr(args, name)}
+    try:
+        source = sys.stdin.buffer if args.input == '-' else args.input
+        stats = process_jsonl(source, args.rules, chunk_size=args.chunk_size, **outputs)
+    finally:
+        for output in outputs.values():
+            output.close()
+
+    print(f'{stats.records} records in {stats.elapsed:.3f}s ({stats.records_per_second:.0f} records/s): '
+          f'{stats.valid} valid, {stats.sanitized} sanitized, {stats.rejected} rejected', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
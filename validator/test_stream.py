@@ -0,0 +1,44 @@
+import io
+import json
+
+from stream import REJECTED, SANITIZED, VALID, iter_jsonl, process_jsonl
+from validator import is_defined_string, is_optional_email
+
+RULES = {
+    'username': [is_defined_string()],
+    'email': [is_optional_email()],
+}
+
+LINES = [
+    json.dumps({'username': 'a', 'email': 'a@test.de', 'unused': 1}),
+    '',
+    json.dumps({'username': 'b', 'email': 'no-mail'}),
+    '{"username": "broken',
+    '[1, 2]',
+]
+
+
+def test_iter_jsonl_keeps_line_numbers_across_chunks():
+    source = io.BytesIO('\n'.join(LINES).encode() + b'\n')
+    # rejected lines of a chunk come before its validated records
+    results = sorted(iter_jsonl(source, RULES, chunk_size=2), key=lambda result: result.line_number)
+
+    assert [(status, line_number) for status, line_number, _ in results] == [
+        (VALID, 1), (SANITIZED, 3), (REJECTED, 4), (REJECTED, 5)]
+    assert results[0].record == {'username': 'a', 'email': 'a@test.de'}
+    assert results[1].record == {'username': 'b'}
+    assert results[2].record['raw'] == '{"username": "broken'
+
+
+def test_process_jsonl_writes_the_sinks(tmp_path):
+    source = tmp_path / 'input.jsonl'
+    source.write_text('\n'.join(LINES) + '\n')
+    valid, rejected = io.StringIO(), io.BytesIO()
+    sanitized = []
+
+    stats = process_jsonl(str(source), RULES, valid=valid, sanitized=sanitized.append, rejected=rejected)
+
+    assert (stats.records, stats.valid, stats.sanitized, stats.rejected) == (4, 1, 1, 2)
+    assert [json.loads(line) for line in valid.getvalue().splitlines()] == [{'username': 'a', 'email': 'a@test.de'}]
+    assert sanitized == [{'username': 'b'}]
+    assert [json.loads(line)['line'] for line in rejected.getvalue().splitlines()] == [4, 5]
@@ -0,0 +1,211 @@
+import logging
+import pickle
+import time
+from datetime import datetime
+
+import pytest
+
+from validator import (DateParser, InvalidRequest, ValidationCache, ValidationError, ValidationMetrics, add_hook,
+                       compile_schema, is_date_in_past, is_datetime, is_defined_string, is_not_empty_string,
+                       is_optional_email, is_valid_email, is_valid_uri, reference_time, remove_hook, sanitize,
+                       sanitize_many, sanitize_report, validate, validate_and_raise, validate_many, validate_parallel)
+
+RULES = {
+    'username': [is_defined_string(), is_not_empty_string()],
+    'email': [is_optional_email()],
+    'address': {
+        'city': [is_not_empty_string()],
+    },
+}
+
+
+def test_compiled_schema_matches_validate():
+    schema = compile_schema(RULES)
+    target = {'username': '', 'email': 'no-mail', 'address': {'city': None}, 'unused': 1}
+
+    assert schema.validate(target) == validate(target, RULES)
+    assert sorted(schema.validate(target)) == ['address.city', 'email', 'username']
+    assert schema.validate({'username': 'nick', 'address': {'city': 'Hamburg'}}) == {}
+    assert schema.validate({'username': 'nick'}) == {}  # missing nested dictionaries are not checked
+    assert compile_schema(schema) is schema
+
+
+def test_validate_many_rows_and_columns():
+    records = [{'username': 'a'}, None, {'username': 1, 'email': 'no-mail'}, {'username': 'c', 'address': {'city': ''}}]
+    result = validate_many(records, RULES)
+
+    assert (len(result), result.invalid, result.valid) == (4, [2, 3], [0, 1])
+    assert result[2] == validate(records[2], RULES)
+    assert result[1] == {}
+    with pytest.raises(IndexError):
+        result[4]
+
+    columns = {'username': ['a', 1, 'c'], 'email': [None, 'no-mail', None], 'address': [None, None, {'city': ''}]}
+    assert list(validate_many(columns, RULES)) == [result[0], result[2], result[3]]
+    with pytest.raises(ValueError):
+        validate_many({'username': ['a'], 'email': []}, RULES)
+
+
+def test_validate_many_structured_array():
+    numpy = pytest.importorskip('numpy')
+    records = numpy.array([('a', 'a@test.de'), ('', 'no-mail')], dtype=[('username', 'U8'), ('email', 'U16')])
+
+    result = validate_many(records, {'username': [is_not_empty_string()], 'email': [is_optional_email()]})
+    assert result.invalid == [1]
+    assert sorted(result[1]) == ['email', 'username']
+
+
+def test_rules_and_schemas_pickle():
+    cache = ValidationCache(maxsize=10)
+    rules = dict(RULES, contact=[is_optional_email(cache)])
+    cache.lookup(('email', 'a@test.de'), bool, 'a@test.de')
+
+    assert pickle.loads(pickle.dumps(RULES)) == RULES
+    schema = pickle.loads(pickle.dumps(compile_schema(rules, name='customer')))
+    copy = schema.rules['contact'][0].cache
+    assert (schema.name, copy.maxsize, copy.stats()['size']) == ('customer', 10, 0)  # the copy starts empty
+    target = {'username': 'a', 'contact': 'no-mail'}
+    assert schema.validate(target) == compile_schema(rules).validate(target)
+
+
+def test_validate_parallel_matches_validate_many():
+    records = [{'username': f'user{index}', 'email': 'no-mail' if index % 3 else None} for index in range(20)]
+    result = validate_parallel(records, RULES, workers=2, shard_size=7)
+
+    assert result.invalid == validate_many(records, RULES).invalid
+    assert list(result) == list(validate_many(records, RULES))
+
+
+def test_fail_fast_stops_at_the_first_error():
+    rules = {'email': [is_valid_email()], 'username': [is_defined_string()]}
+    target = {'email': 'no-mail'}
+
+    assert sorted(validate(target, rules)) == ['email', 'username']
+    assert list(validate(target, rules, fail_fast=True)) == ['email']
+    assert list(compile_schema(rules, order_by_cost=True).validate(target, fail_fast=True)) == ['username']
+    assert validate({'email': 'a@test.de', 'username': 'a'}, rules, fail_fast=True) == {}
+
+    with pytest.raises(InvalidRequest) as raised:
+        validate_and_raise(target, rules)
+    assert (raised.value.error_code, raised.value.error_message) == (400, 'email should be valid e-mail address')
+    with pytest.raises(InvalidRequest) as raised:
+        compile_schema(rules, order_by_cost=True).validate_and_raise(target)
+    assert raised.value.error_message == 'username should be set and string'
+
+
+@pytest.mark.parametrize('expected_format, values', [
+    ('%Y-%m-%d', ['2021-07-02', '2021-7-2', '2021-02-29', '2020-02-29', '2021-13-01', '2021-07-02 ', 'x']),
+    ('%Y-%m-%dT%H:%M:%S', ['2021-07-02T06:01:53', '2021-07-02T24:00:00', '2021-07-02T6:1:5']),
+    ('%Y-%m-%dT%H:%M:%S.%f%z', ['2021-07-02T06:01:53.781835+00:00', '2021-07-02T06:01:53.781835+0200',
+                                '2021-07-02T06:01:53+00:00', '2021-07-02T06:01:53.781835']),
+])
+def test_date_parser_agrees_with_strptime(expected_format, values):
+    parser = DateParser(expected_format)
+    for value in values:
+        try:
+            expected = datetime.strptime(value, expected_format)
+        except ValueError:
+            expected = None
+        assert parser.parse(value) == expected, value
+    assert parser.cache_info().currsize == len(values)
+
+
+def test_reference_time_fixes_now():
+    rules = {'birthday': [is_date_in_past()], 'created': [is_datetime('%Y-%m-%d')]}
+    target = {'birthday': '2001-01-01', 'created': '2001-01-01'}
+
+    assert validate(target, rules) == {}
+    with reference_time(datetime(2000, 1, 1)) as now:
+        assert now == datetime(2000, 1, 1)
+        with reference_time() as nested:
+            assert nested == now
+        assert list(validate(target, rules)) == ['birthday']
+
+
+def test_validation_cache_is_bounded_and_shared():
+    cache = ValidationCache(maxsize=2)
+    rules = {'email': [is_valid_email(cache)], 'homepage': [is_valid_uri(cache)]}
+
+    assert validate({'email': 'a@test.de', 'homepage': 'https://test.de'}, rules) == {}
+    assert validate({'email': 'a@test.de', 'homepage': 'https://test.de'}, rules) == {}
+    assert list(validate({'email': 'b@test', 'homepage': 'no-url'}, rules)) == ['email', 'homepage']
+    # no-url fails the pre-check and never reaches the cache, b@test evicts the e-mail entry
+    assert cache.stats() == {'hits': 2, 'misses': 3, 'hit_rate': 0.4, 'size': 2, 'maxsize': 2}
+    validate({'email': 'a@test.de', 'homepage': 'https://test.de'}, rules)
+    assert (cache.hits, cache.misses) == (2, 5)  # a@test.de was evicted and evicts the URL in turn
+
+    cache.clear()
+    assert cache.stats()['size'] == cache.stats()['hits'] == 0
+
+
+def test_validation_cache_ttl():
+    cache = ValidationCache(ttl=0.05)
+    cache.lookup(('email', 'a@test.de'), bool, 'a@test.de')
+    cache.lookup(('email', 'a@test.de'), bool, 'a@test.de')
+    time.sleep(0.06)
+    cache.lookup(('email', 'a@test.de'), bool, 'a@test.de')
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_errors_build_their_message_lazily():
+    schema = compile_schema(RULES)
+    errors = schema.errors({'username': None})
+
+    assert list(errors) == ['username']
+    first, second = errors['username']
+    assert isinstance(first, ValidationError) and first._message is None
+    assert (first.code, first['error']) == ('defined_string', True)
+    assert first['message'] == first.message == 'username should be set and string'
+    assert second.as_dict() == {'error': True, 'message': 'username should be non-empty string'}
+    assert schema.validate({'username': None}) == {'username': [first.as_dict(), second.as_dict()]}
+    assert schema.errors({'username': 'a'}) == {}
+
+
+def test_sanitize_drops_unexpected_and_invalid_keys():
+    target = {'username': 'a', 'email': 'no-mail', 'address': {'city': ''}, 'unused': 1}
+
+    sanitized, report = sanitize_report(target, RULES)
+    assert sanitized == {'username': 'a'}
+    assert (report.unexpected, report.invalid, report.dropped) == (['unused'], ['email', 'address'],
+                                                                   ['unused', 'email', 'address'])
+    assert len(target) == 4
+
+    assert sanitize(target, RULES, in_place=True) is target
+    assert target == {'username': 'a'}
+    assert not sanitize_report(target, RULES)[1]
+    assert sanitize_many([{'username': 'a', 'unused': 1}, {'username': 1}], RULES) == [{'username': 'a'}, {}]
+
+
+def test_logging_is_level_gated(caplog):
+    target = {'username': None, 'created': datetime(2021, 1, 1)}  # not JSON serializable
+
+    with caplog.at_level(logging.WARNING, logger='validator'):
+        with pytest.raises(InvalidRequest):
+            validate_and_raise(target, RULES)
+        assert sanitize(target, {'username': [], 'created': []}) == target
+    assert caplog.records == []  # rejected requests log at INFO, the records are only dumped for INFO
+
+    with caplog.at_level(logging.INFO, logger='validator'):
+        with pytest.raises(InvalidRequest):
+            validate_and_raise({'username': None}, RULES)
+    assert [record.levelno for record in caplog.records] == [logging.INFO, logging.INFO]
+
+
+def test_validation_metrics():
+    metrics = ValidationMetrics()
+    schema = compile_schema({'username': [is_not_empty_string()]}, name='customer')
+    add_hook(metrics)
+    try:
+        schema.validate({'username': ''})
+        schema.validate_many([{'username': 'a'}, {'username': ''}, {'username': None}])
+    finally:
+        remove_hook(metrics)
+    schema.validate({'username': ''})
+
+    snapshot = metrics.snapshot()
+    assert [(rule['key'], rule['rule'], rule['calls'], rule['failures']) for rule in snapshot['rules']] == [
+        ('username', 'not_empty_string', 4, 3)]
+    assert [(entry['operation'], entry['calls'], entry['failures']) for entry in snapshot['schemas']] == [
+        ('validate', 1, 1), ('validate_many', 3, 2)]
+    metrics.reset()
+    assert metrics.snapshot()['rules'] == []
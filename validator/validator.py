@@ -1,13 +1,32 @@
 import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Callable, Dict, List, Tuple, Any
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple, Any, Optional
 
 import json
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
 from validators.email import email as valid_email
 from validators.url import url as valid_url
 
+try:
+    import numpy
+except ImportError:  # numpy is optional and only needed for array inputs of validate_many
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
 
 class ExampleException(Exception):
+    log_level = logging.WARNING
+
     def __init__(self, error_code: int = None, error_message: str = 'Error', exception: Exception = None):
         if exception is None:
             self._error_code = error_code
@@ -16,7 +35,7 @@ class ExampleException(Exception):
             self._error_code = 500
             self._error_message = f'{type(exception).__name__} - {exception}'
 
-        logging.warning(f'ExampleException : {self._error_message}')
+        logger.log(self.log_level, 'ExampleException : %s', self._error_message)
 
     @property
     def error_code(self) -> int:
@@ -28,6 +47,9 @@ class ExampleException(Exception):
 
 
 class InvalidRequest(ExampleException):
+    # rejected requests are expected traffic, not a warning
+    log_level = logging.INFO
+
     def __init__(self, validation_results: Dict):
         super().__init__(400, error_message=self.message_from_dictionary(validation_results))
 
@@ -36,279 +58,1222 @@ class InvalidRequest(ExampleException):
         return list(validation_results.items())[0][1][0]['message']
 
 
-def is_defined_bool():
-    def validate_it(key, v):
-        return _ok() if v is not None and isinstance(v, bool) else _error(f'{key} should be set and boolean')
+class ValidationError:
+    """Error of a single rule, the message is only built when it is read
 
-    return validate_it
+    Supports ['error'] and ['message'] like the result dictionaries returned by validate().
+    """
+    __slots__ = ('key', 'rule', '_message')
 
+    def __init__(self, key: Optional[str], rule: Optional['Rule'] = None, message: Optional[str] = None):
+        self.key = key
+        self.rule = rule
+        self._message = message
 
-def is_true_bool():
-    def validate_it(key, v):
-        return _ok() if v is True else _error(f'{key} should be set to True')
+    @property
+    def code(self) -> str:
+        return self.rule.code if self.rule is not None else 'invalid'
+
+    @property
+    def message(self) -> str:
+        if self._message is None:
+            self._message = self.rule.message(self.key)
+        return self._message
 
-    return validate_it
+    def as_dict(self) -> Dict[str, Any]:
+        return {'error': True, 'message': self.message}
 
+    def __getitem__(self, item):
+        if item == 'error':
+            return True
+        if item == 'message':
+            return self.message
+        raise KeyError(item)
 
-def is_false_bool():
-    def validate_it(key, v):
-        return _ok() if v is True else _error(f'{key} should be set to False')
+    def __reduce__(self):
+        return type(self), (self.key, self.rule, self._message)
 
-    return validate_it
+    def __repr__(self):
+        return f'{type(self).__name__}(key={self.key!r}, code={self.code!r})'
 
 
-def is_defined_string():
-    def validate_it(key, v):
-        return _ok() if v is not None and isinstance(v, str) else _error(f'{key} should be set and string')
+class _Ok:
+    __slots__ = ()
 
-    return validate_it
+    def __getitem__(self, item):
+        if item == 'error':
+            return False
+        raise KeyError(item)
 
+    def __reduce__(self):
+        return '_OK'
 
-def is_not_empty_string():
-    def validate_it(key, v):
-        return _ok() if isinstance(v, str) and len(v) > 0 else _error(f'{key} should be non-empty string')
+    def __repr__(self):
+        return 'OK'
 
-    return validate_it
 
+# shared result of every passing check
+_OK = _Ok()
 
-def is_optional_not_empty_string():
-    def validate_it(key, v):
-        return _ok() if v is None or (isinstance(v, str) and len(v) > 0) else _error(
-            f'{key} should be non-empty string')
 
-    return validate_it
+class Rule:
+    """Base class of all rules, a rule is called with (key, value) and returns _OK or a ValidationError
 
+    Rules are plain objects defined by their parameters, so they can be compared, hashed and pickled
+    (e.g. to send a whole rules dictionary to worker processes).
+    """
+    __slots__ = ()
 
-def is_optional_number():
+    # relative cost, used to run cheap rules first in fail fast mode with order_by_cost
+    cost = 1
+    code = 'invalid'
+
+    def __call__(self, key, v):
+        return _OK if self.check(v) else ValidationError(key, self)
+
+    def check(self, v) -> bool:
+        raise NotImplementedError()
+
+    def message(self, key) -> str:
+        raise NotImplementedError()
+
+    def params(self) -> Tuple:
+        return ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.params() == other.params()
+
+    def __hash__(self):
+        return hash((type(self), self.params()))
+
+    def __reduce__(self):
+        return type(self), self.params()
+
+    def __repr__(self):
+        return f'{type(self).__name__}({", ".join(map(repr, self.params()))})'
+
+
+class DefinedBoolRule(Rule):
+    __slots__ = ()
+    code = 'defined_bool'
+
+    def check(self, v) -> bool:
+        return v is not None and isinstance(v, bool)
+
+    def message(self, key) -> str:
+        return f'{key} should be set and boolean'
+
+
+class TrueBoolRule(Rule):
+    __slots__ = ()
+    code = 'true_bool'
+
+    def check(self, v) -> bool:
+        return v is True
+
+    def message(self, key) -> str:
+        return f'{key} should be set to True'
+
+
+class FalseBoolRule(Rule):
+    __slots__ = ()
+    code = 'false_bool'
+
+    def check(self, v) -> bool:
+        return v is True
+
+    def message(self, key) -> str:
+        return f'{key} should be set to False'
+
+
+class DefinedStringRule(Rule):
+    __slots__ = ()
+    code = 'defined_string'
+
+    def check(self, v) -> bool:
+        return v is not None and isinstance(v, str)
+
+    def message(self, key) -> str:
+        return f'{key} should be set and string'
+
+
+class NotEmptyStringRule(Rule):
+    __slots__ = ('optional',)
+    code = 'not_empty_string'
+
+    def __init__(self, optional: bool = False):
+        self.optional = optional
+
+    def check(self, v) -> bool:
+        return (isinstance(v, str) and len(v) > 0) or (self.optional and v is None)
+
+    def check_column(self, column):
+        if numpy is not None and isinstance(column, numpy.ndarray):
+            if column.dtype.kind == 'U':
+                return numpy.char.str_len(column) > 0
+            column = column.tolist()
+        if self.optional:
+            return [v is None or (isinstance(v, str) and len(v) > 0) for v in column]
+        return [isinstance(v, str) and len(v) > 0 for v in column]
+
+    def message(self, key) -> str:
+        return f'{key} should be non-empty string'
+
+    def params(self) -> Tuple:
+        return self.optional,
+
+
+class OptionalNumberRule(Rule):
+    __slots__ = ()
+    cost = 2
+    code = 'integer_number'
+
+    @staticmethod
     def safe_int(v: Any) -> int:
         try:
             return int(v)
         except ValueError:
             return 0
 
-    def validate_it(key, v):
-        return _ok() if v is None or str(v) == str(safe_int(v)) else _error(f'{key} should be integer number')
+    def check(self, v) -> bool:
+        return v is None or str(v) == str(self.safe_int(v))
 
-    return validate_it
+    def message(self, key) -> str:
+        return f'{key} should be integer number'
 
 
-def is_optional_bool():
+class OptionalBoolRule(Rule):
+    __slots__ = ()
+    cost = 2
+    code = 'boolean'
+
+    @staticmethod
     def safe_bool(v: Any) -> bool:
         try:
             return bool(v)
         except ValueError:
             return False
 
-    def validate_it(key, v):
-        return _ok() if v is None or str(v) == str(safe_bool(v)) else _error(f'{key} should be boolean')
+    def check(self, v) -> bool:
+        return v is None or str(v) == str(self.safe_bool(v))
 
-    return validate_it
+    def message(self, key) -> str:
+        return f'{key} should be boolean'
 
 
-# 2021-07-02T06:01:53.781835+00:00
+DATE_CACHE_SIZE = 4096
 
-def is_datetime(expected_format: str = '%Y-%m-%dT%H:%M:%S.%f%z'):
-    def parse_datetime(v: str):
-        try:
-            return datetime.strptime(v, expected_format) if v is not None else None
-        except ValueError:
-            return None
+# Canonical (zero padded) strings of these formats are parsed without strptime, everything else falls back to it.
+# The patterns only accept ranges strptime accepts as well, so both always agree on the result.
+_DATE = r'[0-9]{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12][0-9]|3[01])'
+_TIME = r'(?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]'
+_FAST_DATE_FORMATS = {
+    '%Y-%m-%d': (re.compile(_DATE + r'\Z'),
+                 lambda v: datetime(int(v[0:4]), int(v[5:7]), int(v[8:10]))),
+    '%Y-%m-%dT%H:%M:%S': (re.compile(_DATE + 'T' + _TIME + r'\Z'),
+                          lambda v: datetime(int(v[0:4]), int(v[5:7]), int(v[8:10]),
+                                             int(v[11:13]), int(v[14:16]), int(v[17:19]))),
+    '%Y-%m-%d %H:%M:%S': (re.compile(_DATE + ' ' + _TIME + r'\Z'),
+                          lambda v: datetime(int(v[0:4]), int(v[5:7]), int(v[8:10]),
+                                             int(v[11:13]), int(v[14:16]), int(v[17:19]))),
+    '%Y-%m-%dT%H:%M:%S.%f%z': (re.compile(_DATE + 'T' + _TIME + r'\.[0-9]{6}[+-](?:[01][0-9]|2[0-3]):[0-5][0-9]\Z'),
+                               datetime.fromisoformat),
+}
 
-    def validate_it(key, v):
-        date = parse_datetime(v)
-        return _ok() if v is not None and date is not None else _error(f'{key} should be valid datetime')
+_reference_time: ContextVar[Optional[datetime]] = ContextVar('reference_time', default=None)
 
-    return validate_it
 
+class DateParser:
+    """datetime.strptime with fast paths for ISO formats and a bounded cache of parsed values"""
+    __slots__ = ('expected_format', 'parse', '_fast')
 
-def is_optional_datetime(expected_format: str = '%Y-%m-%dT%H:%M:%S.%f%z'):
-    def parse_datetime(v: str):
+    def __init__(self, expected_format: str, cache_size: int = DATE_CACHE_SIZE):
+        self.expected_format = expected_format
+        self._fast = _FAST_DATE_FORMATS.get(expected_format)
+        self.parse = lru_cache(maxsize=cache_size)(self._parse) if cache_size else self._parse
+
+    def _parse(self, v: str) -> Optional[datetime]:
         try:
-            return datetime.strptime(v, expected_format) if v is not None else None
+            if self._fast is not None:
+                pattern, fast_parse = self._fast
+                if pattern.match(v):
+                    return fast_parse(v)
+            return datetime.strptime(v, self.expected_format)
         except ValueError:
             return None
 
-    def validate_it(key, v):
-        date = parse_datetime(v)
-        return _ok() if v is None or date is not None else _error(f'{key} should be valid datetime')
+    def cache_info(self):
+        return self.parse.cache_info() if hasattr(self.parse, 'cache_info') else None
 
-    return validate_it
 
+@lru_cache(maxsize=None)
+def get_date_parser(expected_format: str) -> DateParser:
+    return DateParser(expected_format)
 
-def is_date_in_past(expected_format: str = '%Y-%m-%d'):
-    def parse_date(v: str):
-        try:
-            return datetime.strptime(v, expected_format) if v is not None else None
-        except ValueError:
-            return None
 
-    def validate_it(key, v):
-        date = parse_date(v)
-        return _ok() if date is not None and (date < datetime.now()) else _error(f'{key} should be valid date in past')
+@contextmanager
+def reference_time(now: Optional[datetime] = None):
+    """Fix "now" of the date in past rules, e.g. once for a whole batch. Nested blocks keep the outer time."""
+    token = _reference_time.set(now or _reference_time.get() or datetime.now())
+    try:
+        yield _reference_time.get()
+    finally:
+        _reference_time.reset(token)
 
-    return validate_it
 
+def _now() -> datetime:
+    now = _reference_time.get()
+    return now if now is not None else datetime.now()
 
-def is_optional_date_in_past(expected_format: str = '%Y-%m-%d'):
-    def parse_date(v: str):
-        try:
-            return datetime.strptime(v, expected_format) if v is not None else None
-        except ValueError:
-            return None
 
-    def validate_it(key, v):
-        date = parse_date(v)
-        return _ok() if v is None or (date is not None and date < datetime.now()) else _error(
-            f'{key} should be valid date in past')
+# 2021-07-02T06:01:53.781835+00:00
+
+class DatetimeRule(Rule):
+    __slots__ = ('expected_format', 'optional', 'parser')
+    cost = 20
+    code = 'datetime'
 
-    return validate_it
+    def __init__(self, expected_format: str = '%Y-%m-%dT%H:%M:%S.%f%z', optional: bool = False):
+        self.expected_format = expected_format
+        self.optional = optional
+        self.parser = get_date_parser(expected_format)
 
+    def parse_datetime(self, v: str):
+        return self.parser.parse(v) if v is not None else None
 
-def is_enum(enum_cls):
-    def is_valid_enum(v):
+    def check(self, v) -> bool:
+        if v is None:
+            return self.optional
+        return self.parse_datetime(v) is not None
+
+    def message(self, key) -> str:
+        return f'{key} should be valid datetime'
+
+    def params(self) -> Tuple:
+        return self.expected_format, self.optional
+
+
+class DateInPastRule(Rule):
+    __slots__ = ('expected_format', 'optional', 'parser')
+    cost = 20
+    code = 'date_in_past'
+
+    def __init__(self, expected_format: str = '%Y-%m-%d', optional: bool = False):
+        self.expected_format = expected_format
+        self.optional = optional
+        self.parser = get_date_parser(expected_format)
+
+    def parse_date(self, v: str):
+        return self.parser.parse(v) if v is not None else None
+
+    def check(self, v) -> bool:
+        if v is None:
+            return self.optional
+        date = self.parse_date(v)
+        return date is not None and date < _now()
+
+    def message(self, key) -> str:
+        return f'{key} should be valid date in past'
+
+    def params(self) -> Tuple:
+        return self.expected_format, self.optional
+
+
+class EnumRule(Rule):
+    __slots__ = ('enum_cls', 'optional', 'check_column', '_allowed', '_allowed_strings')
+    cost = 3
+    code = 'enum'
+
+    def __init__(self, enum_cls, optional: bool = False):
+        self.enum_cls = enum_cls
+        self.optional = optional
+        self._allowed = self._allowed_strings = None
+        self.check_column = self._check_column
+        # enums with a custom lookup or unhashable values can only be checked value by value
         try:
-            enum_cls(v)
+            if getattr(enum_cls._missing_, '__func__', None) is Enum._missing_.__func__:
+                self._allowed = frozenset(member.value for member in enum_cls) | frozenset(enum_cls)
+        except TypeError:
+            pass
+        if self._allowed is None:
+            self.check_column = None
+        elif all(isinstance(member.value, str) for member in enum_cls):
+            self._allowed_strings = [member.value for member in enum_cls]
+
+    def is_valid_enum(self, v) -> bool:
+        try:
+            self.enum_cls(v)
             return True
         except ValueError:
             return False
 
-    def validate_it(key, v):
-        return _ok() if is_valid_enum(v) else _error(f'{key} should be valid {enum_cls.__name__}')
-
-    return validate_it
+    def check(self, v) -> bool:
+        return (self.optional and v is None) or self.is_valid_enum(v)
 
-
-def is_optional_enum(enum_cls):
-    def is_valid_enum(v):
+    def _is_allowed(self, v) -> bool:
         try:
-            enum_cls(v)
+            return v in self._allowed
+        except TypeError:
+            return False
+
+    def _check_column(self, column):
+        if numpy is not None and isinstance(column, numpy.ndarray):
+            if column.dtype.kind == 'U' and self._allowed_strings is not None:
+                return numpy.isin(column, self._allowed_strings)
+            column = column.tolist()
+        if self.optional:
+            return [v is None or self._is_allowed(v) for v in column]
+        return [self._is_allowed(v) for v in column]
+
+    def message(self, key) -> str:
+        return f'{key} should be valid {self.enum_cls.__name__}'
+
+    def params(self) -> Tuple:
+        return self.enum_cls, self.optional
+
+
+class EqualRule(Rule):
+    __slots__ = ('value',)
+    code = 'equal'
+
+    def __init__(self, value: str):
+        self.value = value
+
+    def check(self, v) -> bool:
+        return v == self.value
+
+    def check_column(self, column):
+        value = self.value
+        if numpy is not None and isinstance(column, numpy.ndarray):
+            if (column.dtype.kind == 'U' and isinstance(value, str)) or (
+                    column.dtype.kind in 'iuf' and isinstance(value, (int, float)) and not isinstance(value, bool)):
+                return column == value
+            column = column.tolist()
+        return [v == value for v in column]
+
+    def message(self, key) -> str:
+        return f'{key} should be equal {self.value}'
+
+    def params(self) -> Tuple:
+        return self.value,
+
+
+class PositiveNumberRule(Rule):
+    __slots__ = ()
+    code = 'positive_number'
+
+    def check(self, v) -> bool:
+        return int(v) > 0
+
+    def check_column(self, column):
+        if numpy is not None and isinstance(column, numpy.ndarray):
+            if column.dtype.kind in 'biu':
+                return column > 0
+            if column.dtype.kind == 'f' and numpy.isfinite(column).all():
+                return numpy.trunc(column) > 0
+            column = column.tolist()
+        return [int(v) > 0 for v in column]
+
+    def message(self, key) -> str:
+        return f'{key} should be positive number'
+
+
+class ValidationCache:
+    """Thread safe LRU cache with optional TTL for the results of the e-mail and URL rules
+
+    One cache can be shared by several rules, the entries are keyed by rule and value.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: Tuple, compute: Callable[[Any], bool], value: Any) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        result = compute(value)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (result, expires)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __reduce__(self):
+        # the lock cannot be pickled, other processes start with an empty cache
+        return type(self), (self.maxsize, self.ttl)
+
+
+class EmailRule(Rule):
+    __slots__ = ('optional', 'cache')
+    cost = 50
+    code = 'email'
+
+    def __init__(self, optional: bool = False, cache: Optional[ValidationCache] = None):
+        self.optional = optional
+        self.cache = cache
+
+    def check(self, v) -> bool:
+        if v is None and self.optional:
             return True
-        except ValueError:
+        # cheap pre-check, the validator needs at least one character before and after an '@'
+        if not isinstance(v, str) or '@' not in v or v[0] == '@' or v[-1] == '@':
             return False
+        if self.cache is None:
+            return _is_valid_email(v)
+        return self.cache.lookup(('email', v), _is_valid_email, v)
 
-    def validate_it(key, v):
-        return _ok() if v is None or is_valid_enum(v) else _error(f'{key} should be valid {enum_cls.__name__}')
+    def message(self, key) -> str:
+        return f'{key} should be valid e-mail address'
 
-    return validate_it
+    def params(self) -> Tuple:
+        return self.optional, self.cache
 
 
-def is_equal(value: str):
-    def validate_it(key, v):
-        return _ok() if v == value else _error(f'{key} should be equal {value}')
+class UriRule(Rule):
+    __slots__ = ('cache',)
+    cost = 50
+    code = 'url'
+
+    def __init__(self, cache: Optional[ValidationCache] = None):
+        self.cache = cache
+
+    def check(self, v) -> bool:
+        # cheap pre-check, the validator only accepts URLs with a scheme
+        if not isinstance(v, str) or '://' not in v:
+            return False
+        if self.cache is None:
+            return _is_valid_url(v)
+        return self.cache.lookup(('url', v), _is_valid_url, v)
+
+    def message(self, key) -> str:
+        return f'{key} should be valid URL'
+
+    def params(self) -> Tuple:
+        return self.cache,
+
+
+def is_defined_bool():
+    return DefinedBoolRule()
+
+
+def is_true_bool():
+    return TrueBoolRule()
+
+
+def is_false_bool():
+    return FalseBoolRule()
+
+
+def is_defined_string():
+    return DefinedStringRule()
+
+
+def is_not_empty_string():
+    return NotEmptyStringRule()
+
+
+def is_optional_not_empty_string():
+    return NotEmptyStringRule(optional=True)
+
+
+def is_optional_number():
+    return OptionalNumberRule()
+
+
+def is_optional_bool():
+    return OptionalBoolRule()
 
-    return validate_it
+
+def is_datetime(expected_format: str = '%Y-%m-%dT%H:%M:%S.%f%z'):
+    return DatetimeRule(expected_format)
+
+
+def is_optional_datetime(expected_format: str = '%Y-%m-%dT%H:%M:%S.%f%z'):
+    return DatetimeRule(expected_format, optional=True)
+
+
+def is_date_in_past(expected_format: str = '%Y-%m-%d'):
+    return DateInPastRule(expected_format)
+
+
+def is_optional_date_in_past(expected_format: str = '%Y-%m-%d'):
+    return DateInPastRule(expected_format, optional=True)
+
+
+def is_enum(enum_cls):
+    return EnumRule(enum_cls)
+
+
+def is_optional_enum(enum_cls):
+    return EnumRule(enum_cls, optional=True)
+
+
+def is_equal(value: str):
+    return EqualRule(value)
 
 
 def is_positive_number():
-    def validate_it(key, v):
-        return _ok() if int(v) > 0 else _error(f'{key} should be positive number')
+    return PositiveNumberRule()
+
+
+def is_valid_email(cache: Optional[ValidationCache] = None):
+    return EmailRule(cache=cache)
+
+
+def is_optional_email(cache: Optional[ValidationCache] = None):
+    return EmailRule(optional=True, cache=cache)
+
+
+def is_valid_uri(cache: Optional[ValidationCache] = None):
+    return UriRule(cache=cache)
+
+
+class CompiledSchema:
+    __slots__ = ('rules', 'name', 'order_by_cost', 'costs', '_plan', '_timed_plan')
+
+    def __init__(self, rules: Dict[str, List[Callable[[any], bool]]], order_by_cost: bool = False,
+                 costs: Optional[Dict[type, int]] = None, name: Optional[str] = None):
+        self.rules = rules
+        self.name = name or 'schema'
+        self.order_by_cost = order_by_cost
+        self.costs = costs
+        self._plan = _Plan(_compile_fields(rules, ''))
+        self._timed_plan = None
+
+    def __reduce__(self):
+        return type(self), (self.rules, self.order_by_cost, self.costs, self.name)
+
+    def validate(self, target: dict, fail_fast: bool = False) -> Dict[str, str]:
+        errors = self.errors(target, fail_fast)
+        return _as_results(errors) if errors else errors
+
+    def errors(self, target: dict, fail_fast: bool = False) -> Dict[str, List[ValidationError]]:
+        if not _hooks:
+            return self._errors(self._plan, target, fail_fast)
+
+        start = time.perf_counter()
+        result = self._errors(self._instrumented_plan(), target, fail_fast)
+        _notify_schema(self.name, 'validate', 1, 1 if result else 0, time.perf_counter() - start)
+        return result
+
+    def _errors(self, plan: '_Plan', target: dict, fail_fast: bool) -> Dict[str, List[ValidationError]]:
+        if fail_fast:
+            return self._first_error(plan, target)
+        result = {}
+        if target is not None:
+            _collect_errors(target, plan.fields, result)
+        return result
+
+    def _first_error(self, plan: '_Plan', target: dict) -> Dict[str, List[ValidationError]]:
+        if target is None:
+            return {}
+        if plan.checks is None:
+            plan.checks = _compile_checks(plan.fields, (), (self.costs or {}) if self.order_by_cost else None)
+
+        for parents, key, flat_key, validation in plan.checks:
+            nested = target
+            for parent in parents:
+                nested = nested.get(parent)
+                if nested is None:
+                    break
+            else:
+                outcome = validation(key, nested.get(key))
+                if outcome is not _OK and outcome['error']:
+                    return {flat_key: [outcome]}
+        return {}
+
+    def _instrumented_plan(self) -> '_Plan':
+        if self._timed_plan is None:
+            self._timed_plan = _Plan(_instrument_fields(self._plan.fields, self.name))
+        return self._timed_plan
+
+    def validate_many(self, records) -> 'BatchResult':
+        size, positions, column_of = _batch_columns(records)
+        plan = self._instrumented_plan() if _hooks else self._plan
+        start = time.perf_counter()
+
+        errors = {}
+        with reference_time():
+            _collect_batch_errors(plan.fields, column_of, positions, errors)
+
+        if _hooks:
+            _notify_schema(self.name, 'validate_many', size, len(errors), time.perf_counter() - start)
+        return BatchResult(size, errors)
+
+    def sanitize_many(self, records) -> List[dict]:
+        if _is_columnar(records):
+            records = _rows_from_columns(records)
+        elif not isinstance(records, list):
+            records = list(records)
+        result = self.validate_many(records)
+        logger.info('sanitize_many : %s of %s records with invalid values', len(result.errors), result.size)
+
+        return [self.strip(target, result.errors.get(index)) for index, target in enumerate(records)]
+
+    def strip(self, target: dict, errors: Optional[Dict[str, List[ValidationError]]] = None) -> dict:
+        """Copy of target with only the keys of the rules, minus the top level keys that have errors"""
+        if errors is None:
+            return {k: v for k, v in target.items() if k in self.rules}
+        invalid_keys = {key.split('.')[0] for key in errors}
+        return {k: v for k, v in target.items() if k in self.rules and k not in invalid_keys}
+
+    def validate_and_raise(self, target: dict, fail_fast: bool = True):
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Validating: %s', json.dumps(target))
+
+        result = self.errors(target, fail_fast)
+
+        if len(result) > 0:
+            raise InvalidRequest(_as_results(result))
+
+    def sanitize(self, target: dict, in_place: bool = False) -> dict:
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('sanitizing: %s \n %s', json.dumps(target), self.rules)
+
+        sanitized_target, report = self.sanitize_report(target, in_place)
+        if report:
+            logger.warning('sanitize : %s', report)
+        return sanitized_target
+
+    def sanitize_report(self, target: dict, in_place: bool = False) -> Tuple[dict, 'SanitizeReport']:
+        if not _hooks:
+            return self._sanitize(self._plan, target, in_place)
+
+        start = time.perf_counter()
+        result = self._sanitize(self._instrumented_plan(), target, in_place)
+        _notify_schema(self.name, 'sanitize', 1, 1 if result[1].invalid else 0, time.perf_counter() - start)
+        return result
+
+    @staticmethod
+    def _sanitize(plan: '_Plan', target: dict, in_place: bool) -> Tuple[dict, 'SanitizeReport']:
+        fields = plan.top_level_fields
+        unexpected, invalid = [], []
+
+        if in_place:
+            for key in list(target):
+                field = fields.get(key)
+                if field is None:
+                    unexpected.append(key)
+                    del target[key]
+                elif _field_has_errors(field, target[key]):
+                    invalid.append(key)
+                    del target[key]
+            return target, SanitizeReport(unexpected, invalid)
+
+        sanitized_target = {}
+        for key, value in target.items():
+            field = fields.get(key)
+            if field is None:
+                unexpected.append(key)
+            elif _field_has_errors(field, value):
+                invalid.append(key)
+            else:
+                sanitized_target[key] = value
+        return sanitized_target, SanitizeReport(unexpected, invalid)
+
+
+class _Plan:
+    __slots__ = ('fields', 'top_level_fields', 'checks')
+
+    def __init__(self, fields: Tuple):
+        self.fields = fields
+        self.top_level_fields = {field[0]: field for field in fields}
+        # fail fast checks are only compiled on first use
+        self.checks = None
+
+
+class SanitizeReport:
+    """Keys removed by sanitize, either not part of the rules or with invalid values"""
+    __slots__ = ('unexpected', 'invalid')
+
+    def __init__(self, unexpected: List[str], invalid: List[str]):
+        self.unexpected = unexpected
+        self.invalid = invalid
+
+    @property
+    def dropped(self) -> List[str]:
+        return self.unexpected + self.invalid
+
+    def __bool__(self):
+        return bool(self.unexpected or self.invalid)
+
+    def __repr__(self):
+        return f'{type(self).__name__}(unexpected={self.unexpected}, invalid={self.invalid})'
+
+
+def compile_schema(rules: Dict[str, List[Callable[[any], bool]]], order_by_cost: bool = False,
+                   costs: Optional[Dict[type, int]] = None, name: Optional[str] = None) -> CompiledSchema:
+    if isinstance(rules, CompiledSchema):
+        return rules
+    return CompiledSchema(rules, order_by_cost, costs, name)
+
+
+class ValidationHook:
+    """Base class for instrumentation hooks, register instances with add_hook()
+
+    on_rule is called for every rule call (or vectorized pass over a column with calls > 1),
+    on_schema once per validate, sanitize or validate_many call of a schema.
+    """
 
-    return validate_it
+    def on_rule(self, schema: str, key: str, rule: Callable, calls: int, failures: int, elapsed: float):
+        pass
 
+    def on_schema(self, schema: str, operation: str, records: int, failures: int, elapsed: float):
+        pass
 
-def is_valid_email():
-    def validate_it(key, v):
-        return _ok() if isinstance(v, str) and valid_email(v) else _error(f'{key} should be valid e-mail address')
 
-    return validate_it
+class ValidationMetrics(ValidationHook):
+    """Call counts, failure counts and timing histograms per rule and per schema"""
 
+    # upper bounds in seconds of the histogram buckets, the last bucket holds everything above
+    BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0)
 
-def is_optional_email():
-    def validate_it(key, v):
-        return _ok() if v is None or (isinstance(v, str) and valid_email(v)) else _error(
-            f'{key} should be valid e-mail address')
+    def __init__(self):
+        self.rules: Dict[Tuple[str, str, str], _CallStats] = {}
+        self.schemas: Dict[Tuple[str, str], _CallStats] = {}
+        self._lock = threading.Lock()
+
+    def on_rule(self, schema: str, key: str, rule: Callable, calls: int, failures: int, elapsed: float):
+        rule_name = getattr(rule, 'code', None) or getattr(rule, '__name__', type(rule).__name__)
+        with self._lock:
+            stats = self.rules.get((schema, key, rule_name))
+            if stats is None:
+                stats = self.rules[(schema, key, rule_name)] = _CallStats(len(self.BUCKETS) + 1)
+            stats.add(calls, failures, elapsed, bisect_left(self.BUCKETS, elapsed / calls) if calls else 0)
+
+    def on_schema(self, schema: str, operation: str, records: int, failures: int, elapsed: float):
+        with self._lock:
+            stats = self.schemas.get((schema, operation))
+            if stats is None:
+                stats = self.schemas[(schema, operation)] = _CallStats(len(self.BUCKETS) + 1)
+            stats.add(records, failures, elapsed, bisect_left(self.BUCKETS, elapsed))
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            return {
+                'buckets': list(self.BUCKETS),
+                'rules': [dict(schema=schema, key=key, rule=rule, **stats.as_dict())
+                          for (schema, key, rule), stats in self.rules.items()],
+                'schemas': [dict(schema=schema, operation=operation, **stats.as_dict())
+                            for (schema, operation), stats in self.schemas.items()],
+            }
+
+    def reset(self):
+        with self._lock:
+            self.rules.clear()
+            self.schemas.clear()
+
+
+class _CallStats:
+    __slots__ = ('calls', 'failures', 'seconds', 'histogram')
+
+    def __init__(self, buckets: int):
+        self.calls = 0
+        self.failures = 0
+        self.seconds = 0.0
+        self.histogram = [0] * buckets
+
+    def add(self, calls: int, failures: int, elapsed: float, bucket: int):
+        self.calls += calls
+        self.failures += failures
+        self.seconds += elapsed
+        self.histogram[bucket] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'calls': self.calls, 'failures': self.failures, 'seconds': self.seconds,
+                'histogram': list(self.histogram)}
+
+
+_hooks: List[ValidationHook] = []
+
+
+def add_hook(hook: ValidationHook):
+    _hooks.append(hook)
+
+
+def remove_hook(hook: ValidationHook):
+    _hooks.remove(hook)
+
+
+def _notify_rule(schema: str, key: str, rule: Callable, calls: int, failures: int, elapsed: float):
+    for hook in _hooks:
+        hook.on_rule(schema, key, rule, calls, failures, elapsed)
+
+
+def _notify_schema(schema: str, operation: str, records: int, failures: int, elapsed: float):
+    for hook in _hooks:
+        hook.on_schema(schema, operation, records, failures, elapsed)
+
+
+class _TimedRule:
+    """Wraps a rule of an instrumented schema and reports every call to the hooks"""
+    __slots__ = ('schema', 'key', 'wrapped', 'check_column')
+
+    def __init__(self, schema: str, key: str, wrapped: Callable):
+        self.schema = schema
+        self.key = key
+        self.wrapped = wrapped
+        self.check_column = self._check_column if getattr(wrapped, 'check_column', None) is not None else None
+
+    def __call__(self, key, v):
+        start = time.perf_counter()
+        outcome = self.wrapped(key, v)
+        elapsed = time.perf_counter() - start
+        _notify_rule(self.schema, self.key, self.wrapped, 1, 0 if outcome is _OK or not outcome['error'] else 1,
+                     elapsed)
+        return outcome
+
+    def _check_column(self, column):
+        start = time.perf_counter()
+        passed = self.wrapped.check_column(column)
+        elapsed = time.perf_counter() - start
+        _notify_rule(self.schema, self.key, self.wrapped, len(column), len(_failed_positions(passed)), elapsed)
+        return passed
+
+
+class BatchResult:
+    """Sparse error index of validate_many, only records with errors have an entry"""
+    __slots__ = ('size', 'errors')
+
+    def __init__(self, size: int, errors: Dict[int, Dict[str, List[ValidationError]]]):
+        self.size = size
+        self.errors = errors
+
+    @property
+    def invalid(self) -> List[int]:
+        return sorted(self.errors)
+
+    @property
+    def valid(self) -> List[int]:
+        return [index for index in range(self.size) if index not in self.errors]
 
-    return validate_it
+    def is_valid(self, index: int) -> bool:
+        return index not in self.errors
 
+    def __getitem__(self, index: int) -> Dict[str, List[Dict]]:
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return _as_results(self.errors.get(index, {}))
 
-def is_valid_uri():
-    def validate_it(key, v):
-        return _ok() if isinstance(v, str) and valid_url(v) else _error(f'{key} should be valid URL')
+    def __len__(self) -> int:
+        return self.size
 
-    return validate_it
+    def __iter__(self):
+        return (_as_results(self.errors.get(index, {})) for index in range(self.size))
 
+    def __repr__(self):
+        return f'{type(self).__name__}(size={self.size}, invalid={self.invalid})'
 
-def validate(target: dict, rules: Dict[str, List[Callable[[any], bool]]]) -> Dict[str, str]:
-    return _flatten(_apply_rules(target, rules))
 
+class ParallelValidator:
+    """Process pool for validate_many, every worker holds the compiled schema from its start"""
 
-def validate_and_raise(target: dict, rules: Dict[str, List[Callable[[any], bool]]]):
-    logging.info(f"Validating: {json.dumps(target)}")
+    def __init__(self, rules: Dict[str, List[Callable[[any], bool]]], workers: Optional[int] = None,
+                 shard_size: int = 1000):
+        self.schema = compile_schema(rules)
+        self.shard_size = shard_size
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_load_worker_schema,
+                                             initargs=(self.schema,))
 
-    result = validate(target, rules)
+    def validate_many(self, records) -> BatchResult:
+        records = _shardable(records)
+        now = _now()
+        shards = ((start, records[start:start + self.shard_size], now)
+                  for start in range(0, len(records), self.shard_size))
 
-    if len(result) > 0:
-        raise InvalidRequest(result)
+        errors = {}
+        for start, shard_errors in self._executor.map(_validate_shard, shards):
+            for index, record_errors in shard_errors.items():
+                errors[start + index] = record_errors
+        return BatchResult(len(records), errors)
 
+    def sanitize_many(self, records) -> List[dict]:
+        records = _rows_from_columns(records) if _is_columnar(records) else _shardable(records)
+        result = self.validate_many(records)
+        return [self.schema.strip(target, result.errors.get(index)) for index, target in enumerate(records)]
 
-def sanitize(target: dict, rules: Dict[str, List[Callable[[any], bool]]]) -> dict:
-    logging.info(f"sanitizing: {json.dumps(target)} \n {rules}")
-    sanitized_target = target.copy()
+    def close(self):
+        self._executor.shutdown()
 
-    for target_key in list(sanitized_target.keys()):
-        if target_key not in rules.keys():
-            logging.warning(f'sanitize : unexpected key found {target_key}')
-            del sanitized_target[target_key]
+    def __enter__(self):
+        return self
 
-    result = validate(sanitized_target, rules)
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
-    if len(result) == 0:
-        return target
 
-    for key in result:
-        top_level_key = key.split('.')[0]
-        logging.warning(
-            f'sanitize : invalid value found {key} = {sanitized_target.get(key)} : {json.dumps(result.get(key))}')
-        if top_level_key in sanitized_target:
-            del sanitized_target[top_level_key]
+def validate(target: dict, rules: Dict[str, List[Callable[[any], bool]]], fail_fast: bool = False) -> Dict[str, str]:
+    return compile_schema(rules).validate(target, fail_fast)
 
-    return sanitized_target
 
+def validate_and_raise(target: dict, rules: Dict[str, List[Callable[[any], bool]]], fail_fast: bool = True):
+    compile_schema(rules).validate_and_raise(target, fail_fast)
 
-def _apply_rules(target: dict, rules: Dict[str, List[Callable[[any], bool]]]) -> List[Tuple[Any, List[Dict[str, str]]]]:
-    if target is None:
-        return []
-    return list(
-        map(
-            lambda x:
-            (x[0],
-             _apply_all_validations(target, x[0], x[1]) if isinstance(x[1], List) else _apply_rules(target.get(x[0]),
-                                                                                                    x[1])),
-            rules.items()
-        ))
 
+def sanitize(target: dict, rules: Dict[str, List[Callable[[any], bool]]], in_place: bool = False) -> dict:
+    return compile_schema(rules).sanitize(target, in_place)
 
-def _apply_all_validations(target: dict, key: str, validations: List[Callable[[str, any], bool]]) -> List[
-    Dict[str, str]]:
-    return list(filter(
-        lambda result: result['error'],
-        map(
-            lambda validation:
-            validation(key, target.get(key)),
-            validations
-        )))
+
+def sanitize_report(target: dict, rules: Dict[str, List[Callable[[any], bool]]],
+                    in_place: bool = False) -> Tuple[dict, SanitizeReport]:
+    return compile_schema(rules).sanitize_report(target, in_place)
+
+
+def validate_many(records, rules: Dict[str, List[Callable[[any], bool]]]) -> BatchResult:
+    return compile_schema(rules).validate_many(records)
+
+
+def sanitize_many(records, rules: Dict[str, List[Callable[[any], bool]]]) -> List[dict]:
+    return compile_schema(rules).sanitize_many(records)
+
+
+def validate_parallel(records, rules: Dict[str, List[Callable[[any], bool]]], workers: Optional[int] = None,
+                      shard_size: int = 1000) -> BatchResult:
+    with ParallelValidator(rules, workers, shard_size) as validator:
+        return validator.validate_many(records)
+
+
+# A compiled field is (key, flat_key, validations, children); children is None for leaf keys
+def _compile_fields(rules: Dict, parent_key: str) -> Tuple:
+    fields = []
+    for key, validations in rules.items():
+        flat_key = parent_key + '.' + key if parent_key else key
+        if isinstance(validations, list):
+            fields.append((key, flat_key, tuple(validations), None))
+        else:
+            fields.append((key, flat_key, (), _compile_fields(validations, flat_key)))
+    return tuple(fields)
+
+
+# Fail fast checks are (parent keys, key, flat_key, validation) in declared order, or sorted by cost
+def _field_has_errors(field: Tuple, value: Any) -> bool:
+    key, _, validations, children = field
+    if children is not None:
+        return value is not None and _has_errors(value, children)
+    for validation in validations:
+        outcome = validation(key, value)
+        if outcome is not _OK and outcome['error']:
+            return True
+    return False
+
+
+def _has_errors(target: dict, fields: Tuple) -> bool:
+    get = target.get
+    for field in fields:
+        if _field_has_errors(field, get(field[0])):
+            return True
+    return False
+
+
+def _compile_checks(fields: Tuple, parents: Tuple, costs: Optional[Dict[type, int]]) -> Tuple:
+    checks = []
+    for key, flat_key, validations, children in fields:
+        if children is not None:
+            checks.extend(_compile_checks(children, parents + (key,), None))
+        else:
+            checks.extend((parents, key, flat_key, validation) for validation in validations)
+    if costs is not None:
+        checks.sort(key=lambda check: _rule_cost(_unwrap(check[3]), costs))
+    return tuple(checks)
+
+
+def _rule_cost(validation: Callable, costs: Dict[type, int]) -> int:
+    return costs.get(type(validation), getattr(validation, 'cost', Rule.cost))
+
+
+def _instrument_fields(fields: Tuple, schema: str) -> Tuple:
+    return tuple(
+        (key, flat_key, tuple(_TimedRule(schema, flat_key, validation) for validation in validations),
+         _instrument_fields(children, schema) if children is not None else None)
+        for key, flat_key, validations, children in fields)
+
+
+def _unwrap(validation: Callable) -> Callable:
+    return validation.wrapped if isinstance(validation, _TimedRule) else validation
+
+
+def _collect_errors(target: dict, fields: Tuple, result: Dict):
+    get = target.get
+    for key, flat_key, validations, children in fields:
+        if children is not None:
+            nested = get(key)
+            if nested is not None:
+                _collect_errors(nested, children, result)
+            continue
+
+        value = get(key)
+        errors = None
+        for validation in validations:
+            outcome = validation(key, value)
+            if outcome is not _OK and outcome['error']:
+                if errors is None:
+                    errors = [outcome]
+                else:
+                    errors.append(outcome)
+        if errors is not None:
+            result[flat_key] = errors
+
+
+# Batches are either a list of records, a dict of columns or a numpy structured array
+def _batch_columns(records) -> Tuple[int, List[int], Callable]:
+    if numpy is not None and isinstance(records, numpy.ndarray):
+        if records.dtype.names is None:
+            raise ValueError('validate_many : numpy input has to be a structured array with named fields')
+        size = len(records)
+        return size, range(size), lambda key: records[key] if key in records.dtype.names else [None] * size
+
+    if isinstance(records, dict):
+        sizes = {len(column) for column in records.values()}
+        if len(sizes) > 1:
+            raise ValueError(f'validate_many : columns have different lengths {sorted(sizes)}')
+        size = sizes.pop() if sizes else 0
+        return size, range(size), lambda key: records[key] if key in records else [None] * size
+
+    records = records if isinstance(records, list) else list(records)
+    positions = [index for index, target in enumerate(records) if target is not None]
+    if len(positions) == len(records):
+        return len(records), range(len(records)), _row_columns(records)
+    return len(records), positions, _row_columns([records[index] for index in positions])
+
+
+# The schema of a ParallelValidator worker process, set once by the pool initializer
+_worker_schema: Optional[CompiledSchema] = None
+
+
+def _load_worker_schema(schema: CompiledSchema):
+    global _worker_schema
+    _worker_schema = schema
+
+
+def _validate_shard(shard: Tuple[int, Any, datetime]) -> Tuple[int, Dict]:
+    start, records, now = shard
+    with reference_time(now):
+        return start, _worker_schema.validate_many(records).errors
+
+
+def _shardable(records):
+    if isinstance(records, dict):
+        return _rows_from_columns(records)
+    if isinstance(records, list) or (numpy is not None and isinstance(records, numpy.ndarray)):
+        return records
+    return list(records)
+
+
+def _is_columnar(records) -> bool:
+    return isinstance(records, dict) or (numpy is not None and isinstance(records, numpy.ndarray))
+
+
+def _rows_from_columns(records) -> List[dict]:
+    names = records.dtype.names if numpy is not None and isinstance(records, numpy.ndarray) else list(records)
+    columns = [_as_values(records[name]) for name in names]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _row_columns(rows: List[dict]) -> Callable:
+    return lambda key: [row.get(key) for row in rows]
+
+
+def _as_values(column) -> List:
+    return column.tolist() if numpy is not None and isinstance(column, numpy.ndarray) else column
+
+
+def _collect_batch_errors(fields: Tuple, column_of: Callable, positions, errors: Dict):
+    for key, flat_key, validations, children in fields:
+        column = column_of(key)
+        if children is not None:
+            nested_positions, nested_rows = [], []
+            for position, nested in zip(positions, _as_values(column)):
+                if nested is not None:
+                    nested_positions.append(position)
+                    nested_rows.append(nested)
+            if nested_rows:
+                _collect_batch_errors(children, _row_columns(nested_rows), nested_positions, errors)
+            continue
+
+        values = None
+        for validation in validations:
+            check_column = getattr(validation, 'check_column', None)
+            if check_column is not None:
+                failed = _failed_positions(check_column(column))
+                if not failed:
+                    continue
+                if values is None:
+                    values = _as_values(column)
+                # vectorized rules build their message from the key only, so one error is shared
+                outcome = _unwrap(validation)(key, values[failed[0]])
+                for index in failed:
+                    _add_batch_error(errors, positions[index], flat_key, outcome)
+                continue
+
+            if values is None:
+                values = _as_values(column)
+            for position, value in zip(positions, values):
+                outcome = validation(key, value)
+                if outcome is not _OK and outcome['error']:
+                    _add_batch_error(errors, position, flat_key, outcome)
+
+
+def _add_batch_error(errors: Dict, position: int, flat_key: str, outcome: ValidationError):
+    record_errors = errors.get(position)
+    if record_errors is None:
+        errors[position] = {flat_key: [outcome]}
+    elif flat_key in record_errors:
+        record_errors[flat_key].append(outcome)
+    else:
+        record_errors[flat_key] = [outcome]
+
+
+def _failed_positions(passed) -> List[int]:
+    if numpy is not None and isinstance(passed, numpy.ndarray):
+        return numpy.flatnonzero(~passed).tolist()
+    return [index for index, ok in enumerate(passed) if not ok]
+
+
+def _is_valid_email(v: str) -> bool:
+    return bool(valid_email(v))
+
+
+def _is_valid_url(v: str) -> bool:
+    return bool(valid_url(v))
 
 
 def _ok():
-    return {'error': False}
+    return _OK
 
 
 def _error(message: str):
-    return {
-        'error': True,
-        'message': message,
-    }
-
-
-# Borrowed from https://stackoverflow.com/a/6027615
-def _flatten(d: List, parent_key='', sep='.') -> Dict:
-    items = []
-    for k, v in d:
-        new_key = parent_key + sep + k if parent_key else k
-        if len(v) == 0:
-            pass
-        elif isinstance(v[0], Tuple):
-            items.extend(_flatten(v, new_key, sep=sep).items())
-        else:
-            items.append((new_key, v))
-    return dict(items)
+    return ValidationError(None, message=message)
+
+
+# Rules may also be plain callables returning result dictionaries, those are passed through unchanged
+def _as_results(errors: Dict[str, List]) -> Dict[str, List[Dict]]:
+    return {key: [outcome.as_dict() if isinstance(outcome, ValidationError) else outcome for outcome in outcomes]
+            for key, outcomes in errors.items()}